@@ -52,7 +52,7 @@ def add(a: int, b: int, stack: Stack = global_stack) -> Number:
         stack.clear_flag(5)  # Clear overflow/infinity
         if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
             stack.set_flag(5)  # Set infinity flag
-        logger.info(f"Add (FLOAT): {a} + {b} = {result}")
+        logger.info("Add (FLOAT): %s + %s = %s", a, b, result)
         return result
     else:
         if not (isinstance(a, int) and isinstance(b, int)):
@@ -76,7 +76,7 @@ def add(a: int, b: int, stack: Stack = global_stack) -> Number:
             carry = 0
         stack.set_flag(4) if carry else stack.clear_flag(4)
         stack.set_flag(5) if overflow else stack.clear_flag(5)
-        logger.info(f"Add: {a} + {b} = {result} ({mode}), carry={carry}, overflow={overflow}")
+        logger.info("Add: %s + %s = %s (%s), carry=%s, overflow=%s", a, b, result, mode, carry, overflow)
         return result
 
 def subtract(a: int, b: int, stack: Stack = global_stack) -> Number:
@@ -86,7 +86,7 @@ def subtract(a: int, b: int, stack: Stack = global_stack) -> Number:
         stack.clear_flag(5)
         if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
             stack.set_flag(5)
-        logger.info(f"Subtract (FLOAT): {a} - {b} = {result}")
+        logger.info("Subtract (FLOAT): %s - %s = %s", a, b, result)
         return result
     else:
         mode = stack.get_complement_mode()
@@ -114,7 +114,7 @@ def subtract(a: int, b: int, stack: Stack = global_stack) -> Number:
             stack.set_flag(5)
         else:
             stack.clear_flag(5)
-        logger.info(f"Subtract: {a} - {b} = {result} ({mode}), borrow={borrow}, overflow={overflow}")
+        logger.info("Subtract: %s - %s = %s (%s), borrow=%s, overflow=%s", a, b, result, mode, borrow, overflow)
         return result
 
 def multiply(a: int, b: int, stack: Stack = global_stack) -> Number:
@@ -124,7 +124,7 @@ def multiply(a: int, b: int, stack: Stack = global_stack) -> Number:
         stack.clear_flag(5)
         if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
             stack.set_flag(5)
-        logger.info(f"Multiply (FLOAT): {a} * {b} = {result}")
+        logger.info("Multiply (FLOAT): %s * %s = %s", a, b, result)
         return result
     else:
         mode = stack.get_complement_mode()
@@ -140,7 +140,7 @@ def multiply(a: int, b: int, stack: Stack = global_stack) -> Number:
             result = from_signed(result_signed, word_size, mode)
         stack.clear_flag(4)
         stack.clear_flag(5)
-        logger.info(f"Multiply: {a} * {b} = {result} ({mode})")
+        logger.info("Multiply: %s * %s = %s (%s)", a, b, result, mode)
         return result
 
 def divide(a: int, b: int, stack: Stack = global_stack) -> Number:
@@ -152,7 +152,7 @@ def divide(a: int, b: int, stack: Stack = global_stack) -> Number:
         stack.clear_flag(5)
         if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
             stack.set_flag(5)
-        logger.info(f"Divide (FLOAT): {a} / {b} = {result}")
+        logger.info("Divide (FLOAT): %s / %s = %s", a, b, result)
         return result
     else:
         if b == 0:
@@ -182,5 +182,5 @@ def divide(a: int, b: int, stack: Stack = global_stack) -> Number:
             stack.set_flag(5)
         else:
             stack.clear_flag(5)
-        logger.info(f"Divide: {a} / {b} = {result} ({mode}), remainder={remainder}, overflow={overflow}")
+        logger.info("Divide: %s / %s = %s (%s), remainder=%s, overflow=%s", a, b, result, mode, remainder, overflow)
         return result
@@ -0,0 +1,64 @@
+"""
+bitops.py
+Word-size-bounded bit kernels (shifts, rotates, masks) used by the stack's f-mode bit operations.
+Author: GlobeyCode
+License: MIT
+Created: 4/06/2025
+Last Modified: 4/06/2025
+Dependencies: Python 3.6+, typing
+"""
+
+from typing import Tuple
+
+# All-ones mask for every legal word size (WORD_MASKS[ws] == (1 << ws) - 1), built once at import
+WORD_MASKS: Tuple[int, ...] = tuple((1 << ws) - 1 for ws in range(65))
+# Single-bit masks for SB/CB/B? (BIT_MASKS[i] == 1 << i)
+BIT_MASKS: Tuple[int, ...] = tuple(1 << i for i in range(64))
+
+# Plain functions of (value, word_size[, n]) -> (result, carry). They hold no stack or flag state,
+# so Stack only has to read X, call one kernel and write X and the carry flag back.
+
+def shift_left(x: int, word_size: int) -> Tuple[int, int]:
+    """SL: shift left one bit; carry is the bit shifted out of the MSB."""
+    return (x << 1) & WORD_MASKS[word_size], (x >> (word_size - 1)) & 1
+
+def shift_right(x: int) -> Tuple[int, int]:
+    """SR (unsigned): shift right one bit; carry is the bit shifted out of the LSB."""
+    return x >> 1, x & 1
+
+def rotate_left(x: int, word_size: int) -> Tuple[int, int]:
+    """RL: rotate left one bit, MSB wraps to LSB and is also the carry."""
+    msb = (x >> (word_size - 1)) & 1
+    return ((x << 1) & WORD_MASKS[word_size]) | msb, msb
+
+def rotate_right(x: int, word_size: int) -> Tuple[int, int]:
+    """RR: rotate right one bit, LSB wraps to MSB and is also the carry."""
+    lsb = x & 1
+    return (x >> 1) | (lsb << (word_size - 1)), lsb
+
+def rotate_left_n(x: int, word_size: int, n: int) -> Tuple[int, int]:
+    """RLn: rotate x left by n bits; carry is the MSB of the result."""
+    rotated = ((x << n) | (x >> (word_size - n))) & WORD_MASKS[word_size]
+    return rotated, (rotated >> (word_size - 1)) & 1
+
+def rotate_right_n(x: int, word_size: int, n: int) -> Tuple[int, int]:
+    """RRn: rotate x right by n bits; carry is the LSB of the result."""
+    rotated = ((x >> n) | (x << (word_size - n))) & WORD_MASKS[word_size]
+    return rotated, rotated & 1
+
+def left_mask(bits: int, word_size: int) -> int:
+    """MASKL: 'bits' ones in the most significant positions."""
+    return ((1 << bits) - 1) << (word_size - bits)
+
+def right_mask(bits: int) -> int:
+    """MASKR: 'bits' ones in the least significant positions."""
+    return (1 << bits) - 1
+
+if hasattr(int, "bit_count"):  # Python 3.10+
+    def popcount(x: int) -> int:
+        """#B: number of 1 bits in a non-negative x."""
+        return x.bit_count()
+else:
+    def popcount(x: int) -> int:
+        """#B: number of 1 bits in a non-negative x."""
+        return bin(x).count('1')
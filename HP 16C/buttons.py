@@ -5,22 +5,28 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/06/2025
-Dependencies: Python 3.6+, stack, logging_config
+Dependencies: Python 3.6+, stack, entry_mode, logging_config
 """
 
-from typing import Any, Dict, List, Callable
+from typing import Any, Dict, FrozenSet, List, Callable
 import stack
+from entry_mode import EntryMode
 from logging_config import logger, program_logger
 
-# Define valid characters for different bases.
-VALID_CHARS: Dict[str, set] = {
-    "BIN": set("01"),
-    "OCT": set("01234567"),
-    "DEC": set("0123456789"),
-    "HEX": set("0123456789ABCDEF"),
-    "FLOAT": set("0123456789.")
+# Define valid characters for different bases (immutable hash sets; checked on every digit key).
+VALID_CHARS: Dict[str, FrozenSet[str]] = {
+    "BIN": frozenset("01"),
+    "OCT": frozenset("01234567"),
+    "DEC": frozenset("0123456789"),
+    "HEX": frozenset("0123456789ABCDEF"),
+    "FLOAT": frozenset("0123456789.")
 }
 
+# Keycodes shown in the program listing for operator and base-change steps; digit steps show the digit itself
+OPERATOR_KEYCODES: Dict[str, str] = {"÷": "10", "×": "20", "-": "30", "+": "40", ".": "48", "ENTER": "36"}
+BASE_KEYCODES: Dict[str, str] = {"HEX": "23", "DEC": "24", "OCT": "25", "BIN": "26"}
+PROGRAM_DIGITS: FrozenSet[str] = frozenset("0123456789ABCDEFabcdef")
+
 
 def normal_action_digit(digit: str, display_widget: Any) -> None:
     """
@@ -28,7 +34,7 @@ def normal_action_digit(digit: str, display_widget: Any) -> None:
     
     If the current display entry is "0", clears it before appending.
     """
-    logger.info(f"Normal digit action: {digit}")
+    logger.info("Normal digit action: %s", digit)
     if display_widget.get_entry() == "0":
         display_widget.set_entry("")
         display_widget.raw_value = ""
@@ -46,7 +52,7 @@ def handle_normal_command_by_label(btn: Dict[str, Any], display: Any, controller
         return
 
     label_text: str = main_label_widget.cget("text").replace("\n", "").strip().upper()
-    logger.info(f"Handling normal command: {label_text}")
+    logger.info("Handling normal command: %s", label_text)
 
     if label_text == "GSB":
         controller_obj.gsb()
@@ -72,22 +78,21 @@ def handle_normal_command_by_label(btn: Dict[str, Any], display: Any, controller
     elif label_text == "CHS":
         controller_obj.change_sign()
     elif label_text == "STO":
-        controller_obj.entry_mode = "sto"
+        controller_obj.entry_mode = EntryMode.STO
         logger.info("Entered STO mode, waiting for register number")
     elif label_text == "RCL":
-        controller_obj.entry_mode = "rcl"
+        controller_obj.entry_mode = EntryMode.RCL
         logger.info("Entered RCL mode, waiting for register number")
     elif label_text == "ON":
         controller_obj.reload_program()
 
 
-def revert_to_normal(button: Dict[str, Any], buttons: List[Dict[str, Any]] = None,
-                     display: Any = None, controller_obj: Any = None) -> None:
+def revert_to_normal(button: Dict[str, Any]) -> None:
     """
-    Revert a button to its normal appearance and bindings.
+    Revert a button to its normal appearance.
     
     Resets background and label colors using stored original values.
-    If additional parameters are provided, rebinds the normal button action.
+    Bindings are untouched: the click handler checks the f/g flags itself.
     """
     frame = button.get("frame")
     if frame:
@@ -115,25 +120,6 @@ def revert_to_normal(button: Dict[str, Any], buttons: List[Dict[str, Any]] = Non
         sub_label.config(fg=orig_sub_fg, bg=orig_bg)
         sub_label.place(relx=0.5, rely=1, anchor="s")
 
-    if buttons is not None and display is not None and controller_obj is not None:
-        cmd = button.get("command_name")
-        if cmd not in ("yellow_f_function", "blue_g_function", "reload_program"):
-            bind_normal_button(button, display, controller_obj)
-
-
-def bind_normal_button(btn: Dict[str, Any], display: Any, controller_obj: Any) -> None:
-    """
-    Bind a normal command action to the button's widgets.
-    
-    Uses the handle_normal_command_by_label function.
-    """
-    def on_click(e: Any) -> None:
-        handle_normal_command_by_label(btn, display, controller_obj)
-    for w in [btn.get("frame"), btn.get("top_label"), btn.get("main_label"), btn.get("sub_label")]:
-        if w:
-            w.unbind("<Button-1>")
-            w.bind("<Button-1>", on_click)
-
 
 def bind_buttons(buttons: List[Dict[str, Any]], display: Any, controller_obj: Any) -> None:
     """
@@ -150,6 +136,8 @@ def bind_buttons(buttons: List[Dict[str, Any]], display: Any, controller_obj: An
 def bind_button_logic(btn: Dict[str, Any], cmd_name: str, display: Any, controller_obj: Any) -> None:
     """
     Bind specific logic to a button based on its command name.
+
+    Each widget is bound once at startup; f/g mode switches only restyle the keys.
     """
     def on_click(e: Any) -> None:
         handle_command(cmd_name, btn, display, controller_obj)
@@ -159,14 +147,14 @@ def bind_button_logic(btn: Dict[str, Any], cmd_name: str, display: Any, controll
 
 
 def handle_command(cmd_name: str, btn: Dict[str, Any], display: Any, controller_obj: Any) -> None:
-    logger.info(f"Handling command: {cmd_name}")
+    logger.info("Handling command: %s", cmd_name)
     if cmd_name == "yellow_f_function":
         controller_obj.toggle_mode("f")
     elif cmd_name == "blue_g_function":
         controller_obj.toggle_mode("g")
     elif cmd_name == "reload_program":
         reload_program()
-    else:
+    elif not controller_obj.handle_mode_key(btn):
         handle_normal_command_by_label(btn, display, controller_obj)
 
 
@@ -175,21 +163,22 @@ def handle_backspace(display_widget: Any, controller_obj: Any) -> None:
         # Program mode logic unchanged
         if controller_obj.program_memory:
             removed_instruction = controller_obj.program_memory.pop()
+            controller_obj._program_dirty = True
+            if isinstance(removed_instruction, str) and removed_instruction.startswith("LBL "):
+                controller_obj.forget_label(removed_instruction[4:])
             step = len(controller_obj.program_memory)
-            program_logger.info(f"BSP: Removed step {step + 1:03d} - {removed_instruction}")
-            logger.info(f"BSP executed: Removed '{removed_instruction}', new length={len(controller_obj.program_memory)}")
+            program_logger.info("BSP: Removed step %03d - %s", step + 1, removed_instruction)
+            logger.info("BSP executed: Removed '%s', new length=%s", removed_instruction, len(controller_obj.program_memory))
             if controller_obj.program_memory:
                 last_instruction = controller_obj.program_memory[-1]
-                op_map = {"÷": "10", "×": "20", "-": "30", "+": "40", ".": "48", "ENTER": "36"}
-                base_map = {"HEX": "23", "DEC": "24", "OCT": "25", "BIN": "26"}
                 if isinstance(last_instruction, str):
-                    if last_instruction in op_map:
-                        display_code = op_map[last_instruction]
-                    elif last_instruction in base_map:
-                        display_code = base_map[last_instruction]
+                    if last_instruction in OPERATOR_KEYCODES:
+                        display_code = OPERATOR_KEYCODES[last_instruction]
+                    elif last_instruction in BASE_KEYCODES:
+                        display_code = BASE_KEYCODES[last_instruction]
                     elif last_instruction.startswith("LBL "):
                         display_code = last_instruction.split()[1]
-                    elif last_instruction in "0123456789ABCDEFabcdef":
+                    elif last_instruction in PROGRAM_DIGITS:
                         display_code = last_instruction.upper()
                     else:
                         display_code = str(last_instruction)
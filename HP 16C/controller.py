@@ -5,19 +5,41 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/05/2025
-Dependencies: Python 3.6+, buttons, f_mode, g_mode, error, logging_config, stack
+Dependencies: Python 3.6+, buttons, f_mode, g_mode, entry_mode, error, logging_config, stack
 """
 
-from typing import Any, List, Optional, Tuple, Union
-from buttons import VALID_CHARS, revert_to_normal
+import logging
+from array import array
+from typing import Any, Callable, List, Optional, Tuple, Union
+from buttons import VALID_CHARS, BASE_KEYCODES, revert_to_normal
 from f_mode import f_action
 from g_mode import g_action
+from entry_mode import EntryMode
 from error import HP16CError, StackUnderflowError
 from logging_config import logger, program_logger
 from stack import Stack
 
 print("Loading controller.py from this file")
 
+# Opcodes for the compiled form of program_memory used by run_program
+OP_DIGIT = 0
+OP_OPERATOR = 1
+OP_ENTER = 2
+OP_GOTO = 3
+OP_BASE = 4
+OP_GSB = 5
+OP_RTN = 6
+OP_NOP = 7  # LBL and unrecognised steps keep their line so labels index _ops directly
+
+# The HP-16C keeps at most four pending subroutine returns
+MAX_RETURN_DEPTH = 4
+
+# Radix of each integer display mode, and the value of each digit key (VALID_CHARS has already vetted it)
+BASE_RADIX = {"HEX": 16, "OCT": 8, "BIN": 2, "DEC": 10}
+DIGIT_VALUES = {c: int(c, 16) for c in "0123456789abcdefABCDEF"}
+# Register, flag and FLOAT n keys only take decimal digits
+DECIMAL_DIGITS = {c: int(c) for c in "0123456789"}
+
 class HP16CController:
     """
     Controller for the HP-16C emulator.
@@ -36,12 +58,13 @@ class HP16CController:
         f_mode_active: True if f-mode is active.
         g_mode_active: True if g-mode is active.
         program_mode: True if in program mode.
-        entry_mode: Current entry mode (e.g., "sto", "rcl", "set_decimal_places", "gsb_label").
+        entry_mode: Current EntryMode (e.g., STO, RCL, SET_DECIMAL_PLACES, GSB_LABEL), or None.
         program_memory: List of instructions for programming mode.
         last_program_step: Last step number in program memory.
         current_line: Current line pointer for running programs.
-        labels: Dictionary mapping label names to line numbers.
-        return_stack: Stack of return addresses for subroutine calls.
+        labels: Dictionary mapping label names to line numbers, kept in step with program_memory edits.
+        _ret: Preallocated return-address slots for subroutine calls.
+        _retsp: Index of the next free slot in _ret.
         decimal_entered: True if a decimal point has been entered.
         pre_entry_x: Store X before user entry begins.
     """
@@ -53,8 +76,24 @@ class HP16CController:
         logger.info("Default word size set to 8 bits")
         self.show_stack_display: bool = False
         self.display = display
+        # Bound methods used on every keystroke, looked up once
+        self._peek = stack.peek
+        self._format_in_base = stack.format_in_base
+        self._fmt_cache: dict = {}  # (value, mode, pad, word size, complement, flag 3) -> text
+        self._set_entry = display.set_entry
+        self._binops = {"+": stack.add, "-": stack.subtract, "×": stack.multiply, "÷": stack.divide,
+                        "and": stack.logical_and, "or": stack.logical_or, "xor": stack.logical_xor}
+        # Digit handlers for each pending EntryMode, in EntryMode order
+        self._entry_handlers = (self._digit_sto, self._digit_rcl, self._digit_set_flag, self._digit_clear_flag,
+                                self._digit_test_flag, self._digit_decimal_places, self._digit_gsb_label,
+                                self._digit_label)
+        # run_program handlers indexed by opcode; None marks the control-flow opcodes handled inline and OP_NOP
+        self._op_handlers = (self.enter_digit, self.enter_operator, lambda _: self.enter_value(), None,
+                             self.enter_base_change, None, None, None)
         self.buttons = buttons
         self.stack_display = stack_display
+        self._stack_text: Optional[str] = None  # Text last configured on stack_display
+        self._mode_widgets: Optional[List[Tuple[dict, Any, Any, Any, Any]]] = None  # Built by _mode_button_widgets
         self.is_user_entry: bool = False
         self.result_displayed: bool = True
         self.stack_lift_enabled: bool = True
@@ -62,14 +101,22 @@ class HP16CController:
         self.f_mode_active: bool = False
         self.g_mode_active: bool = False
         self.program_mode: bool = False
-        self.entry_mode: Optional[str] = None
+        self.entry_mode: Optional[EntryMode] = None
         self.program_memory: List[Union[str, Tuple[int, str]]] = []
         self.last_program_step: int = 0
         self.current_line: int = 0
         self.labels: dict = {}
-        self.return_stack: List[int] = []
+        self._ret: array = array('i')
+        self._retsp: int = 0
         self.decimal_entered: bool = False
         self.pre_entry_x: int = 0  # Store X before user entry
+        self._entry_val: int = 0  # Integer value of the digits entered so far
+        self._restore_after_id: Optional[str] = None  # Pending Tk timer that puts X back after B?/F?
+        self._error_after_id: Optional[str] = None  # Pending Tk timer that clears an error message
+        # program_memory compiled by _compile_program: opcodes and their arguments as parallel sequences
+        self._ops: array = array('B')
+        self._args: List[Any] = []
+        self._program_dirty: bool = True  # Set whenever program_memory is edited; _compile_program clears it
 
     def initialize(self) -> None:
         """Initialize the controller by setting the stack mode to DEC and updating the display."""
@@ -81,199 +128,185 @@ class HP16CController:
 ### ERRORS ###
 
     def handle_error(self, error: Exception) -> None:
-        """Display error message."""
-        self.previous_value = self.display.current_entry
+        """Display error message; a second error before the restore keeps the value shown before the first."""
+        widget = self.display.widget
+        if self._error_after_id is None:
+            self.previous_value = self.display.current_entry
+        else:
+            widget.after_cancel(self._error_after_id)
         error_message = str(error)
         self.display.set_entry(error_message, raw=True, is_error=True)
-        self.display.widget.after(5000, self.restore_normal_display)
-
-### SCREEN BLINKING ###
-
-    def _bind_mode_action(self, btn: dict, mode: str) -> None:
-        """Bind mode-specific action to button."""
-        def on_click(e: Any, b: dict = btn) -> None:
-            if mode == "f":
-                f_action(b, self.display, self)
-            elif mode == "g":
-                g_action(b, self.display, self)
-        for w in [btn["frame"], btn.get("top_label"), btn.get("main_label"), btn.get("sub_label")]:
-            if w:
-                w.unbind("<Button-1>")
-                w.bind("<Button-1>", on_click)
+        self._error_after_id = widget.after(5000, self.restore_normal_display)
 
 ### DIGIT OPERATIONS ###
 
-    def enter_digit(self, digit: str) -> None:
-        """Process a digit or decimal point entry, handling flags and limits."""
-        logger.info(f"Entering digit: {digit}")
-        # Handle flag modes (SF, CF, F?) - unchanged
-        if self.entry_mode == "set_flag":
-            try:
-                flag_num = int(digit)
-                if 0 <= flag_num <= 5:
-                    self.stack.set_flag(flag_num)
-                    self.entry_mode = None
-                    self.is_user_entry = False
-                    top_val = self.stack.peek()
-                    self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode), blink=True)
-                    self.update_stack_display()
-                    logger.info(f"Set flag {flag_num} to 1")
-                else:
-                    self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
-            except ValueError:
-                self.handle_error(HP16CError("Invalid input for flag", "E02"))
-            return
+    def _digit_label(self, digit: str) -> None:
+        """LBL: record the label in program mode."""
+        self.entry_mode = None
+        self.record_label(digit.upper())
 
-        if self.entry_mode == "clear_flag":
-            try:
-                flag_num = int(digit)
-                if 0 <= flag_num <= 5:
-                    self.stack.clear_flag(flag_num)
-                    self.entry_mode = None
-                    self.is_user_entry = False
-                    top_val = self.stack.peek()
-                    self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode), blink=True)
-                    self.update_stack_display()
-                    logger.info(f"Cleared flag {flag_num} to 0")
-                else:
-                    self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
-            except ValueError:
-                self.handle_error(HP16CError("Invalid input for flag", "E02"))
-            return
+    def _digit_set_flag(self, digit: str) -> None:
+        """SF: set the flag named by the digit."""
+        flag_num = DECIMAL_DIGITS.get(digit)
+        if flag_num is None:
+            self.handle_error(HP16CError("Invalid input for flag", "E02"))
+        elif flag_num <= 5:
+            self.stack.set_flag(flag_num)
+            self.entry_mode = None
+            self.is_user_entry = False
+            self._refresh_display()
+            logger.info("Set flag %s to 1", flag_num)
+        else:
+            self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
 
-        if self.entry_mode == "test_flag":
-            try:
-                flag_num = int(digit)
-                if 0 <= flag_num <= 5:
-                    result = self.stack.test_flag(flag_num)
-                    self.entry_mode = None
-                    self.is_user_entry = False
-                    original_x = self.stack.peek()
-                    original_str = self.stack.format_in_base(original_x, self.display.mode, pad=False)
-                    self.display.set_entry("1" if result else "0", raw=False, blink=True)
-                    logger.info(f"Tested flag {flag_num}: {'1' if result else '0'}")
-                    self.display.master.after(1000, lambda: self.display.set_entry(original_str, raw=False, blink=False))
-                    self.stack_lift_enabled = False
-                    self.update_stack_display()
-                else:
-                    self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
-            except ValueError:
-                self.handle_error(HP16CError("Invalid input for flag", "E02"))
-            return
+    def _digit_clear_flag(self, digit: str) -> None:
+        """CF: clear the flag named by the digit."""
+        flag_num = DECIMAL_DIGITS.get(digit)
+        if flag_num is None:
+            self.handle_error(HP16CError("Invalid input for flag", "E02"))
+        elif flag_num <= 5:
+            self.stack.clear_flag(flag_num)
+            self.entry_mode = None
+            self.is_user_entry = False
+            self._refresh_display()
+            logger.info("Cleared flag %s to 0", flag_num)
+        else:
+            self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
 
-        if self.entry_mode == "set_decimal_places":
-            if digit in "0123456789":
-                decimal_places = int(digit)
-                self.display.decimal_places = None if decimal_places == 0 else decimal_places
-                self.display.set_mode("FLOAT")
-                self.entry_mode = None
-                current_value = self.stack.peek()
-                formatted_value = self.stack.format_in_base(current_value, "FLOAT")
-                self.display.set_entry(formatted_value, blink=True)
-                logger.info(f"Set decimal places to {decimal_places if decimal_places else 'floating'}")
-            return
+    def _digit_test_flag(self, digit: str) -> None:
+        """F?: flash 1/0 for the flag, then restore X."""
+        flag_num = DECIMAL_DIGITS.get(digit)
+        if flag_num is None:
+            self.handle_error(HP16CError("Invalid input for flag", "E02"))
+        elif flag_num <= 5:
+            result = self.stack.test_flag(flag_num)
+            self.entry_mode = None
+            self.is_user_entry = False
+            original_x = self._peek()
+            original_str = self._fmt(original_x, self.display.mode, pad=False)
+            self._set_entry("1" if result else "0", raw=False, blink=True)
+            logger.info("Tested flag %s: %s", flag_num, '1' if result else '0')
+            self._schedule_restore(original_str)
+            self.stack_lift_enabled = False
+            self.update_stack_display()
+        else:
+            self.handle_error(HP16CError("Invalid flag number (0-5)", "E01"))
 
-        if self.entry_mode == "sto":
-            try:
-                reg_num = int(digit)
-                if 0 <= reg_num <= 9:
-                    self.stack._data_registers[reg_num] = self.stack.peek() & ((1 << self.stack.word_size) - 1)
-                    self.entry_mode = None
-                    self.is_user_entry = False
-                    self.display.set_entry(self.stack.format_in_base(self.stack.peek(), self.display.mode), blink=True)
-                    logger.info(f"Stored X={self.stack.peek()} into R{reg_num}")
-                else:
-                    self.handle_error(HP16CError("Invalid register number", "E01"))
-            except ValueError:
-                self.handle_error(HP16CError("Invalid input for register", "E02"))
-            return
+    def _digit_decimal_places(self, digit: str) -> None:
+        """FLOAT n: show n decimal places (0 for floating)."""
+        decimal_places = DECIMAL_DIGITS.get(digit)
+        if decimal_places is not None:
+            self.display.decimal_places = None if decimal_places == 0 else decimal_places
+            self.display.set_mode("FLOAT")
+            self.entry_mode = None
+            current_value = self._peek()
+            formatted_value = self._fmt(current_value, "FLOAT")
+            self._set_entry(formatted_value, blink=True)
+            logger.info("Set decimal places to %s", decimal_places if decimal_places else 'floating')
 
-        if self.entry_mode == "rcl":
-            try:
-                reg_num = int(digit)
-                if 0 <= reg_num <= 9:
-                    value = self.stack._data_registers[reg_num]
-                    self.stack.push(value)
-                    self.display.set_entry(self.stack.format_in_base(value, self.display.mode), blink=True)
-                    self.entry_mode = None
-                    self.is_user_entry = False
-                    self.stack_lift_enabled = False
-                    self.update_stack_display()
-                    logger.info(f"Recalled R{reg_num}={value} into X")
-                else:
-                    self.handle_error(HP16CError("Invalid register number", "E01"))
-            except ValueError:
-                self.handle_error(HP16CError("Invalid input for register", "E02"))
+    def _digit_sto(self, digit: str) -> None:
+        """STO: copy X into the data register."""
+        reg_num = DECIMAL_DIGITS.get(digit)
+        if reg_num is None:
+            self.handle_error(HP16CError("Invalid input for register", "E02"))
+        else:
+            x = self._peek()
+            self.stack._data_registers[reg_num] = x & self.stack._mask
+            self.entry_mode = None
+            self.is_user_entry = False
+            self._set_entry(self._fmt(x, self.display.mode), blink=True)
+            logger.info("Stored X=%s into R%s", x, reg_num)
+
+    def _digit_gsb_label(self, digit: str) -> None:
+        """GSB: the digit names the label to call."""
+        self.entry_mode = None
+        self.gsb(digit.upper())
+
+    def _digit_rcl(self, digit: str) -> None:
+        """RCL: push the data register onto the stack."""
+        reg_num = DECIMAL_DIGITS.get(digit)
+        if reg_num is None:
+            self.handle_error(HP16CError("Invalid input for register", "E02"))
+        else:
+            value = self.stack._data_registers[reg_num]
+            self.stack.push(value)
+            self.entry_mode = None
+            self.is_user_entry = False
+            self.stack_lift_enabled = False
+            self._refresh_display()
+            logger.info("Recalled R%s=%s into X", reg_num, value)
+
+    def enter_digit(self, digit: str) -> None:
+        """Process a digit or decimal point entry, handling flags and limits."""
+        logger.info("Entering digit: %s", digit)
+        if self.entry_mode is not None:
+            # A pending STO/RCL/SF/CF/F?/FLOAT/GSB/LBL consumes this key; EntryMode indexes the handler
+            self._entry_handlers[self.entry_mode](digit)
             return
 
         if digit.upper() not in VALID_CHARS[self.display.mode]:
-            logger.info(f"Ignoring invalid digit {digit} for base {self.display.mode}")
+            logger.info("Ignoring invalid digit %s for base %s", digit, self.display.mode)
             return
 
-        # Lift stack if enabled before starting new entry
-        if not self.is_user_entry and self.stack_lift_enabled:
-            self.stack.push(self.stack.peek())
-            self.stack_lift_enabled = False
-            logger.info(f"Lifted stack: X={self.stack.peek()} pushed to Y")
-
         if not self.is_user_entry:
-            self.pre_entry_x = self.stack.peek()
+            x = self._peek()  # Lifting copies X into Y, so X is the same before and after
+            # Lift stack if enabled before starting new entry
+            if self.stack_lift_enabled:
+                self.stack.push(x)
+                self.stack_lift_enabled = False
+                logger.info("Lifted stack: X=%s pushed to Y", x)
+            self.pre_entry_x = x
             self.display.clear_entry()
             self.display.raw_value = ""
+            self._entry_val = 0
             self.is_user_entry = True
             self.decimal_entered = False
             self.result_displayed = False
 
-        # Determine max/min values based on word size and complement mode
-        word_size = self.stack.word_size
-        complement_mode = self.stack.complement_mode
-        if self.display.mode == "FLOAT":
-            max_val = float('inf')
-            min_val = -float('inf')
-        else:
-            max_val = (1 << word_size) - 1  # e.g., 255 for 8-bit
-            min_val = 0  # Negative values come from operations, not direct entry
-
         current = self.display.raw_value or "0"
         new_value = current + digit
-        try:
-            if self.display.mode == "HEX":
-                raw_val = int(new_value, 16)
-            elif self.display.mode == "OCT":
-                raw_val = int(new_value, 8)
-            elif self.display.mode == "BIN":
-                raw_val = int(new_value, 2)
-            else:
-                raw_val = int(new_value)
-            if self.display.mode != "FLOAT" and (raw_val > max_val or raw_val < min_val):
-                logger.info(f"Input blocked: {raw_val} exceeds {min_val} to {max_val} for {complement_mode} {word_size}-bit")
-                return
-        except ValueError:
-            logger.info(f"Invalid input: {new_value}")
-            return
-
-        if self.display.mode == "HEX":
-            digit_upper = digit.upper()
-            display_digit = digit_upper.lower() if digit_upper in ['B', 'D'] else digit_upper
-        else:
-            display_digit = digit
-
-        self.display.raw_value = new_value
         if self.display.mode == "FLOAT":
+            try:
+                int(new_value)
+            except ValueError:
+                logger.info("Invalid input: %s", new_value)
+                return
+            self.display.raw_value = new_value
             if digit == ".":
                 if self.decimal_entered:
                     logger.info("Ignoring additional decimal point")
                     return
                 self.decimal_entered = True
             formatted_value = self.format_float_with_commas(new_value)
-            self.display.set_entry(formatted_value, raw=True, blink=False)
-        else:
-            val = self.stack.interpret_in_base(new_value, self.display.mode)
-            self.stack._x_register = val
-            formatted_value = self.stack.format_in_base(val, self.display.mode, pad=False)
-            self.display.set_entry(formatted_value, raw=False, blink=False)
+            self._set_entry(formatted_value, raw=True, blink=False)
+            return
+
+        # Integer bases: extend the running value by one digit instead of re-parsing the whole entry
+        word_size = self.stack.word_size
+        max_val = self.stack._mask  # e.g., 255 for 8-bit; negative values come from operations
+        val = self._entry_val * BASE_RADIX[self.display.mode] + DIGIT_VALUES[digit]
+        if val > max_val:
+            logger.info("Input blocked: %s exceeds 0 to %s for %s %s-bit", val, max_val, self.stack.complement_mode, word_size)
+            return
+        self._entry_val = val
+        self.display.raw_value = new_value
+        self.stack._x_register = val
+        formatted_value = self._fmt(val, self.display.mode, pad=False)
+        with self.display.batch():
+            self._set_entry(formatted_value, raw=False, blink=False)
             self.update_stack_display(log_update=True)
 
+    def _fmt(self, value: Union[int, float], mode: str, pad: bool = False) -> str:
+        """format_in_base with memoisation; redraws mostly re-format values that have not changed."""
+        stack = self.stack
+        key = (value, mode, pad, stack.word_size, stack.complement_mode, stack._flags[3])
+        text = self._fmt_cache.get(key)
+        if text is None:
+            if len(self._fmt_cache) >= 256:
+                self._fmt_cache.clear()
+            text = self._fmt_cache[key] = self._format_in_base(value, mode, pad=pad)
+        return text
+
     def get_max_digits(self, mode: str) -> int:
         """Calculate the maximum number of digits allowed based on mode and word size."""
         word_size = self.stack.word_size
@@ -298,8 +331,9 @@ class HP16CController:
             raise ValueError(f"Invalid mode: {mode}")
 
     def enter_operator(self, operator: str) -> None:
-        """Process an operator command (+, -, *, ÷)."""
-        logger.info(f"Entering operator: {operator}, X={self.stack.peek()}, stack={self.stack._stack}")
+        """Process an operator command (+, -, ×, ÷, AND, OR, XOR, NOT)."""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Entering operator: %s, X=%s, stack=%s", operator, self._peek(), self.stack._stack)
         if self.program_mode:
             logger.info("Operation skipped due to program mode")
             return
@@ -308,19 +342,21 @@ class HP16CController:
             if self.display.is_error_displayed:
                 logger.info("Operation skipped due to error state")
                 return
-            if operator in ["+", "-", "×", "÷"]:
+            if operator in self._binops:
                 self.binary_operation(operator)
+            elif operator == "not":
+                self._x_op(self.stack.logical_not)
             else:
                 raise ValueError(f"Unknown operator: {operator}")
             self.post_enter = False
         except ValueError as e:
             self.display.set_error(str(e))
-            logger.info(f"Value error: {e}")
+            logger.info("Value error: %s", e)
         except HP16CError as e:
             self.handle_error(e)
         except Exception as e:
             self.display.set_error(f"Error: {e}")
-            logger.info(f"Unexpected error: {e}")
+            logger.info("Unexpected error: %s", e)
 
     def enter_value(self) -> None:
         logger.info("Entering value (lifting stack)")
@@ -328,24 +364,25 @@ class HP16CController:
             instruction = "ENTER"
             display_code = "36"
             self.program_memory.append(instruction)
+            self._program_dirty = True
             step = len(self.program_memory)
-            program_logger.info(f"{step:03d} - {instruction} ({display_code})")
+            program_logger.info("%03d - %s (%s)", step, instruction, display_code)
             self.display.set_entry((step, display_code), program_mode=True)
             self.last_program_step = step
             return
     
-        current_x = self.stack.peek()
+        current_x = self._peek()
         if self.is_user_entry:
             entry = self.display.raw_value
             val = self.stack.interpret_in_base(entry, self.display.mode)
             self.stack._x_register = val
-            formatted_value = self.stack.format_in_base(val, self.display.mode)
+            formatted_value = self._fmt(val, self.display.mode)
             self.display.set_entry(formatted_value, blink=True)
             self.is_user_entry = False
             self.decimal_entered = False
             self.stack.push(val)
         else:
-            formatted_value = self.stack.format_in_base(current_x, self.display.mode)
+            formatted_value = self._fmt(current_x, self.display.mode)
             self.display.set_entry(formatted_value, blink=True)
             self.stack.push(current_x)
     
@@ -355,21 +392,21 @@ class HP16CController:
 
     def enter_base_change(self, base: str) -> None:
         """Handle base change (HEX, DEC, OCT, BIN)."""
-        logger.info(f"Entering base change: {base}")
+        logger.info("Entering base change: %s", base)
         if self.program_mode:
-            base_map = {"HEX": "23", "DEC": "24", "OCT": "25", "BIN": "26"}
             instruction = base
-            display_code = base_map.get(base, base)
+            display_code = BASE_KEYCODES.get(base, base)
             self.program_memory.append(instruction)
+            self._program_dirty = True
             step = len(self.program_memory)
-            program_logger.info(f"{step:03d} - {instruction} ({display_code})")
+            program_logger.info("%03d - %s (%s)", step, instruction, display_code)
             self.display.set_entry((step, display_code), program_mode=True)
             self.last_program_step = step
         else:
             self.display.set_base(base)
             self.is_user_entry = False
             self.update_stack_display()
-            logger.info(f"Base set to {base}, display updated via set_base")
+            logger.info("Base set to %s, display updated via set_base", base)
 
     def finalize_entry(self) -> None:
         """Convert pending display value to number and update X."""
@@ -384,13 +421,10 @@ class HP16CController:
         """Format a raw float string with commas for the integer part."""
         if not raw_value:
             return "0"
-        sign = "-" if raw_value.startswith("-") else ""
-        number = raw_value[1:] if raw_value.startswith("-") else raw_value
-        if "." in number:
-            integer_part, fractional_part = number.split(".")
-            integer_formatted = "{:,}".format(int(integer_part)) if integer_part else "0"
-            return f"{sign}{integer_formatted}.{fractional_part}"
-        return f"{sign}{'{:,}'.format(int(number))}"
+        sign = "-" if raw_value[0] == "-" else ""
+        integer_part, dot, fractional_part = raw_value[len(sign):].partition(".")
+        integer_formatted = f"{int(integer_part):,}" if integer_part or not dot else "0"
+        return f"{sign}{integer_formatted}{dot}{fractional_part}"
 
 ### DISPLAY OPERATIONS ###
 
@@ -399,39 +433,35 @@ class HP16CController:
         if self.is_user_entry:
             self.display.set_entry(self.display.raw_value, raw=True)
         else:
-            self.display.set_entry(self.stack.format_in_base(self.stack.peek(), self.display.mode))
+            self._set_entry(self._fmt(self._peek(), self.display.mode))
 # F2 STACK DISPLAY DEBUG
     def update_stack_display(self, log_update: bool = False) -> None:
         """Update stack display with X, Y, Z, T and log if requested."""
-        logger.debug("Updating stack display")
-        if self.stack_display and self.show_stack_display:
-            x_val = self.stack.peek()
-            formatted_x = self.stack.format_in_base(x_val, self.display.mode)
-            formatted_stack = [self.stack.format_in_base(x, self.display.mode) for x in self.stack._stack[:3]]
-            while len(formatted_stack) < 3:
-                formatted_stack.insert(0, "0")
-            y, z, t = formatted_stack[-3:]
-            stack_text = f"X: {formatted_x} Y: {y} Z: {z} T: {t}"
+        if not (self.stack_display and self.show_stack_display):
+            # Debug pane is closed: only the status line needs refreshing
+            self.display.update_stack_content()
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Updating stack display")
+        x_val = self._peek()
+        mode = self.display.mode
+        formatted_x = self._fmt(x_val, mode)
+        y_val, z_val, t_val = self.stack.yzt()
+        y, z, t = self._fmt(y_val, mode), self._fmt(z_val, mode), self._fmt(t_val, mode)
+        stack_text = f"X: {formatted_x} Y: {y} Z: {z} T: {t}"
+        if stack_text != self._stack_text:  # Skip the Tk config when the stack did not visibly change
             self.stack_display.config(text=stack_text)
-            if log_update:
-                logger.info(f"Stack display updated: {stack_text}")
+            self._stack_text = stack_text
+        if log_update:
+            logger.info("Stack display updated: %s", stack_text)
         self.display.update_stack_content()
     def toggle_stack_display(self) -> None:
         """Toggle visibility of the stack display and log the state."""
-        logger.info(f"Toggling stack display: show={not self.show_stack_display}, mode={self.entry_mode}")
+        logger.info("Toggling stack display: show=%s, mode=%s", not self.show_stack_display, self.entry_mode)
         self.show_stack_display = not self.show_stack_display
         if self.show_stack_display:
-            # Try to get display position dynamically, fall back to config values
-            try:
-                display_info = self.display.winfo_geometry()  # Get geometry as string (e.g., "575x80+125+20")
-                _, _, x, y = display_info.split('+')  # Extract x, y from end
-                display_y = int(y)
-                display_height = self.display.winfo_height()  # Get height dynamically
-            except AttributeError:
-                # Fallback to config defaults if dynamic lookup fails
-                display_y = 20  # From config 'display_y'
-                display_height = 80  # From config 'display_height'
-                logger.warning("Could not get display geometry dynamically, using fallback values")
+            # Display keeps its frame geometry current via <Configure>; no Tk query needed here
+            _, display_y, _, display_height = self.display._cached_geom
             self.stack_display.place(x=0, y=display_y + display_height + 5)
             self.update_stack_display(log_update=True)
         else:
@@ -439,39 +469,32 @@ class HP16CController:
             logger.info("Stack display hidden")
 
     def binary_operation(self, operator: str) -> None:
-        logger.info(f"Entering binary_operation with operator={operator}, X={self.stack.peek()}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Entering binary_operation with operator=%s, X=%s", operator, self._peek())
         if self.entry_mode is not None:
-            logger.info(f"Ignoring operator {operator} in entry_mode {self.entry_mode}")
+            logger.info("Ignoring operator %s in entry_mode %s", operator, self.entry_mode)
             return
-        self.display.clear_entry()
-        x = self.stack.peek()
-        self.stack.pop()
-        y = self.stack.peek()
-        self.stack.pop()
-        if operator == "+":
-            val, carry, overflow = self.stack.add(y, x)
-            self.stack._last_x = x
-        elif operator == "-":
-            val, borrow, overflow = self.stack.subtract(y, x)
-            self.stack._last_x = x
-        elif operator == "×":
-            val, carry, overflow = self.stack.multiply(y, x)
-            self.stack._last_x = x
-        elif operator == "÷":
-            val, remainder, overflow = self.stack.divide(y, x)
+        op = self._binops.get(operator)
+        with self.display.batch():
+            self.display.clear_entry()
+            if op is None:
+                self.handle_error(HP16CError(f"Unsupported operator: {operator}", "E03"))
+                return
+            x = self.stack.pop()  # pop() returns the X it removed
+            y = self.stack.pop()
+            val, aux, overflow = op(y, x)
             self.stack._last_x = x
-            self.stack._last_remainder = remainder  # Store for f RMD
-        else:
-            self.handle_error(HP16CError(f"Unsupported operator: {operator}", "E03"))
-            return
-        self.stack.push(val)
-        self.display.set_entry(self.stack.format_in_base(val, self.display.mode), blink=True)
-        self.stack_lift_enabled = True
-        self.result_displayed = True
-        self.update_stack_display(log_update=True)
+            if operator == "÷":
+                self.stack._last_remainder = aux  # Store for f RMD
+            self.stack.push(val)
+            self._set_entry(self._fmt(val, self.display.mode), blink=True)
+            self.stack_lift_enabled = True
+            self.result_displayed = True
+            self.update_stack_display(log_update=True)
 
     def restore_normal_display(self) -> None:
         """Restore display after error."""
+        self._error_after_id = None
         self.display.set_entry(self.previous_value, raw=False)
 
 ### PUSH POP ###
@@ -483,10 +506,7 @@ class HP16CController:
             val = self.stack.pop()
             # Note: save_last_x is not a method in Stack; assuming it's meant to be _last_x
             self.stack._last_x = val
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode))
-            self.display.raw_value = str(top_val)
-            self.update_stack_display()
+            self.display.raw_value = self._refresh_display()
             return val
         except HP16CError as e:
             self.handle_error(e)
@@ -494,65 +514,86 @@ class HP16CController:
 
     def push_value(self, value: int) -> None:
         """Push value onto stack."""
-        logger.info(f"Pushing value: {value}")
+        logger.info("Pushing value: %s", value)
         self.stack.push(value)
         self.update_stack_display()
 
 ### TOGGLE ###
 
+    def _mode_button_widgets(self) -> List[Tuple[dict, Any, Any, Any, Any]]:
+        """(button, frame, top, main, sub) for every key that changes with f/g, collected on first use."""
+        if self._mode_widgets is None:
+            self._mode_widgets = [
+                (btn, btn["frame"], btn.get("top_label"), btn.get("main_label"), btn.get("sub_label"))
+                for btn in self.buttons
+                if btn.get("command_name") not in ("yellow_f_function", "blue_g_function", "reload_program")
+            ]
+        return self._mode_widgets
+
+    def revert_mode_buttons(self) -> None:
+        """Restore every key that f/g restyles to its normal colours; keys already normal are left alone."""
+        for btn, *_ in self._mode_button_widgets():
+            if btn.get("styled_mode"):
+                revert_to_normal(btn)
+                btn["styled_mode"] = None
+
     def toggle_mode(self, mode: str) -> None:
         """Toggle f-mode or g-mode."""
-        logger.info(f"Toggling mode: {mode}, f_active={self.f_mode_active}, g_active={self.g_mode_active}")
+        logger.info("Toggling mode: %s, f_active=%s, g_active=%s", mode, self.f_mode_active, self.g_mode_active)
         if (mode == "f" and self.f_mode_active) or (mode == "g" and self.g_mode_active):
             self.f_mode_active = False
             self.g_mode_active = False
             self.display.hide_f_mode()
             self.display.hide_g_mode()
-            for btn in self.buttons:
-                if btn.get("command_name") not in ("yellow_f_function", "blue_g_function", "reload_program"):
-                    revert_to_normal(btn, self.buttons, self.display, self)
+            self.revert_mode_buttons()
             logger.info("Mode reset to normal")
             return
-        for btn in self.buttons:
-            if btn.get("command_name") not in ("yellow_f_function", "blue_g_function", "reload_program"):
-                revert_to_normal(btn, self.buttons, self.display, self)
-                for w in [btn["frame"], btn.get("top_label"), btn.get("main_label"), btn.get("sub_label")]:
-                    if w:
-                        w.unbind("<Button-1>")
         if mode == "f":
             self.f_mode_active = True
             self.g_mode_active = False
             self.display.show_f_mode()
             self.display.hide_g_mode()
             color = "#e3af01"
-            label_key = "top_label"
         elif mode == "g":
             self.f_mode_active = False
             self.g_mode_active = True
             self.display.hide_f_mode()
             self.display.show_g_mode()
             color = "#59b7d1"
-            label_key = "sub_label"
         else:
-            logger.warning(f"Invalid mode: {mode}")
+            logger.warning("Invalid mode: %s", mode)
             return
-        for btn in self.buttons:
-            if btn.get("command_name") in ("yellow_f_function", "blue_g_function", "reload_program"):
+        for btn, frame, top_label, main_label, sub_label in self._mode_button_widgets():
+            label, other_label = (top_label, sub_label) if mode == "f" else (sub_label, top_label)
+            styled = btn.get("styled_mode")  # None when the key shows its normal face
+            if not label:
+                # No function on this key in this mode: show it normally; handle_mode_key ignores it
+                if styled:
+                    revert_to_normal(btn)
+                    btn["styled_mode"] = None
                 continue
-            frame = btn["frame"]
-            label = btn.get(label_key)
-            if label:
-                frame.config(bg=color)
-                label.config(bg=color, fg="black")
-                label.place(relx=0.5, rely=0.5, anchor="center")
-                if btn.get("main_label"):
-                    btn["main_label"].place_forget()
-                if mode == "f" and btn.get("sub_label"):
-                    btn["sub_label"].place_forget()
-                if mode == "g" and btn.get("top_label"):
-                    btn["top_label"].place_forget()
-                self._bind_mode_action(btn, mode)
-        logger.info(f"Mode set: {mode}")
+            frame.config(bg=color)
+            label.config(bg=color, fg="black")
+            label.place(relx=0.5, rely=0.5, anchor="center")
+            if main_label and styled is None:  # Already hidden if the key shows f or g
+                main_label.place_forget()
+            if other_label:
+                other_label.place_forget()
+            btn["styled_mode"] = mode
+        self.display.master.update_idletasks()
+        logger.info("Mode set: %s", mode)
+
+    def handle_mode_key(self, btn: dict) -> bool:
+        """Run btn's f/g function if a prefix is active; False means the key should act normally."""
+        if self.f_mode_active:
+            if btn.get("top_label"):
+                f_action(btn, self.display, self)
+            return True
+        if self.g_mode_active:
+            if btn.get("sub_label"):
+                g_action(btn, self.display, self)
+            return True
+        return False
 
 
 ### NORMAL MODE ROW 2 ###
@@ -560,49 +601,41 @@ class HP16CController:
 # GSB
     def gsb(self, label: Optional[str] = None) -> None:
         """Process GSB command."""
-        logger.info(f"GSB called with label: {label}")
+        logger.info("GSB called with label: %s", label)
         if self.program_mode:
             if label is None:
-                self.entry_mode = "gsb_label"
+                self.entry_mode = EntryMode.GSB_LABEL
             else:
                 instruction = f"GSB {label}"
                 self.program_memory.append(instruction)
+                self._program_dirty = True
                 step = len(self.program_memory)
-                program_logger.info(f"{step:03d} - {instruction} ({label})")
+                program_logger.info("%03d - %s (%s)", step, instruction, label)
                 self.display.set_entry((step, label), program_mode=True)
                 self.entry_mode = None
         else:
             if label is None:
-                self.entry_mode = "gsb_label"
+                self.entry_mode = EntryMode.GSB_LABEL
             else:
-                try:
-                    if label not in self.labels:
-                        raise HP16CError("No such label", "E04")
-                    self.current_line = self.labels[label]
-                    while self.current_line < len(self.program_memory):
-                        instr = self.program_memory[self.current_line]
-                        if instr == "RTN":
-                            break
-                        if not isinstance(instr, str) or not instr.startswith("LBL "):
-                            logger.info(f"Executing: {instr}")
-                        self.current_line += 1
-                except HP16CError as e:
-                    self.handle_error(e)
+                # Run the subroutine through the compiled program; its closing RTN ends the run
+                self.run_program(label)
 
 ### NORMAL MODE ROW 3 ###
 
 # R↓
     def roll_down(self) -> None:
         """Roll stack down."""
-        logger.info(f"Before R↓: X={self.stack._x_register}, stack={self.stack._stack}")
-        old_x = self.stack._x_register
-        self.stack._x_register = self.stack._stack[0]
-        self.stack._stack[0] = self.stack._stack[1]
-        self.stack._stack[1] = self.stack._stack[2]
-        self.stack._stack[2] = old_x
-        logger.info(f"After R↓: X={self.stack._x_register}, stack={self.stack._stack}")
-        self.display.set_entry(self.stack.format_in_base(self.stack._x_register, self.display.mode, pad=False))
-        self.update_stack_display()
+        stack = self.stack
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info("Before R↓: X=%s, stack=%s", stack._x_register, list(stack._stack))
+        # Y becomes X and old X goes to T
+        new_x = stack._stack.popleft()
+        stack._stack.append(stack._x_register)
+        stack._x_register = new_x
+        if log_info:
+            logger.info("After R↓: X=%s, stack=%s", stack._x_register, list(stack._stack))
+        self._refresh_display()
 # X<>Y
     def swap_xy(self) -> None:
         """Swap X and Y registers."""
@@ -610,11 +643,9 @@ class HP16CController:
             val = self.stack.interpret_in_base(self.display.raw_value, self.display.mode)
             self.stack._x_register = val
             self.is_user_entry = False
-        temp = self.stack._x_register
-        self.stack._x_register = self.stack._stack[0]
-        self.stack._stack[0] = temp
-        self.display.set_entry(self.stack.format_in_base(self.stack._x_register, self.display.mode, pad=False))
-        self.update_stack_display()
+        stack = self.stack
+        stack._x_register, stack._stack[0] = stack._stack[0], stack._x_register
+        self._refresh_display()
 # BSP
     def delete_digit(self) -> None:
         """Remove the last entered digit and update the X register."""
@@ -627,11 +658,12 @@ class HP16CController:
             else:
                 val = self.stack.interpret_in_base(self.display.raw_value, self.display.mode)
                 self.stack._x_register = val  # Update X register with interpreted value
-                formatted_value = self.stack.format_in_base(val, self.display.mode, pad=False)
+                if self.display.mode != "FLOAT":
+                    self._entry_val = val
+                formatted_value = self._fmt(val, self.display.mode, pad=False)
                 self.display.set_entry(formatted_value, raw=False, blink=False)
                 self.decimal_entered = "." in self.display.raw_value
-            self.update_stack_display()  # Ensure stack display reflects changes
-            self.update_stack_display(log_update=True)
+            self.update_stack_display(log_update=True)  # Ensure stack display reflects changes
         logger.info("Delete digit executed")
 
 ### NORMAL MODE ROW 4 ###
@@ -642,117 +674,95 @@ class HP16CController:
         try:
             if self.is_user_entry:
                 self.finalize_entry()  # Ensure raw_value is applied to X
+            stack = self.stack
             if self.display.mode == "FLOAT":
-                self.stack._x_register = -self.stack._x_register
+                stack._x_register = -stack._x_register
             else:
-                mode = self.stack.get_complement_mode()
-                word_size = self.stack.get_word_size()
-                mask = (1 << word_size) - 1
-                if mode == "UNSIGNED":
-                    self.stack._x_register = (mask - self.stack._x_register) & mask
-                elif mode == "1S":
-                    self.stack._x_register = (~self.stack._x_register) & mask
-                else:  # 2S
-                    self.stack._x_register = (-self.stack._x_register) & mask
-            top_val = self.stack.peek()
-            formatted_val = self.stack.format_in_base(top_val, self.display.mode, pad=False)
-            self.display.set_entry(formatted_val, blink=True)
-            self.display.raw_value = formatted_val  # Sync raw_value
+                # Under the word mask, mask - x (UNSIGNED) and ~x (1S) are the same value, and 2S is ~x + 1
+                stack._x_register = (~stack._x_register + stack._neg_add) & stack._mask
             self.is_user_entry = False  # Reset entry state
-            self.update_stack_display()
+            self.display.raw_value = self._refresh_display()  # Sync raw_value
         except HP16CError as e:
             self.handle_error(e)
 
 
 ### f MODE ROW 1 ###
 
+    def _refresh_display(self, blink: bool = True) -> str:
+        """Show X in the current base and redraw the stack in one display batch; returns the text shown."""
+        text = self._fmt(self._peek(), self.display.mode, pad=False)
+        with self.display.batch():
+            self._set_entry(text, blink=blink)
+            self.update_stack_display()
+        return text
+
+    def _bit_shift(self, op: Callable[[], None], description: str) -> None:
+        """Shared envelope for SL/SR/RL/RR/RLn/RRn: finish any entry, run the stack op, show X."""
+        logger.info(description)
+        try:
+            if self.is_user_entry:
+                self.finalize_entry()
+            op()
+            self.is_user_entry = False
+            self.display.raw_value = self._refresh_display()
+        except HP16CError as e:
+            self.handle_error(e)
+
+    def _x_op(self, op: Callable[..., None], *args: Any) -> None:
+        """Shared envelope for SB/CB/#B/LJ/ABS/DBL×/DBL÷: finish any entry, run the stack op, show X."""
+        try:
+            if self.is_user_entry:
+                self.finalize_entry()
+            op(*args)
+            self.is_user_entry = False
+            self.stack_lift_enabled = True
+            self._refresh_display()
+        except HP16CError as e:
+            self.handle_error(e)
 # SL
     def shift_left(self) -> None:
         """Shift X left by one bit."""
-        logger.info("Shifting left")
-        self.stack.shift_left()
-        top_val = self.stack.peek()
-        self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-        self.update_stack_display()
+        self._bit_shift(self.stack.shift_left, "Shifting left")
 # SR
     def shift_right(self) -> None:
         """Shift X right by one bit."""
-        logger.info("Shifting right")
-        try:
-            self.stack.shift_right()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.display.raw_value = str(top_val)
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._bit_shift(self.stack.shift_right, "Shifting right")
 # RL
     def rotate_left(self) -> None:
         """Rotate X left by one bit."""
-        logger.info("Rotating left")
-        self.stack.rotate_left()
-        top_val = self.stack.peek()
-        self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-        self.update_stack_display()
+        self._bit_shift(self.stack.rotate_left, "Rotating left")
 # RR
     def rotate_right(self) -> None:
         """Rotate X right by one bit."""
-        logger.info("Rotating right")
-        self.stack.rotate_right()
-        top_val = self.stack.peek()
-        self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-        self.update_stack_display()
+        self._bit_shift(self.stack.rotate_right, "Rotating right")
 # RLn
     def rotate_left_carry(self) -> None:
-        logger.info("Rotating left with carry")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()  # Sets X = 1
-            self.stack.rotate_left_carry()
-            top_val = self.stack.peek()
-            logger.info(f"After rotation, top_val = {top_val}")
-            self.display.set_entry(top_val, raw=False, blink=True)
-            self.display.raw_value = str(top_val)
-            self.is_user_entry = False
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        """Rotate X left with carry."""
+        self._bit_shift(self.stack.rotate_left_carry, "Rotating left with carry")
 # RRn
     def rotate_right_carry(self) -> None:
         """Rotate X right with carry."""
-        logger.info("Rotating right with carry")
-        try:
-            self.stack.rotate_right_carry()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.display.raw_value = str(top_val)
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._bit_shift(self.stack.rotate_right_carry, "Rotating right with carry")
 # MASKL
     def mask_left(self, bits: int) -> None:
         """Mask leftmost bits of Y into X."""
-        logger.info(f"Masking left: {bits} bits")
+        logger.info("Masking left: %s bits", bits)
         try:
             if len(self.stack._stack) < 1:
                 raise StackUnderflowError("Need Y value for MASKL")
             self.stack.mask_left(bits)
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.update_stack_display()
+            self._refresh_display()
         except HP16CError as e:
             self.handle_error(e)
 # MASKR
     def mask_right(self, bits: int) -> None:
         """Mask rightmost bits of Y into X."""
-        logger.info(f"Masking right: {bits} bits")
+        logger.info("Masking right: %s bits", bits)
         try:
             if len(self.stack._stack) < 1:
                 raise StackUnderflowError("Need Y value for MASKR")
             self.stack.mask_right(bits)
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.update_stack_display()
+            self._refresh_display()
         except HP16CError as e:
             self.handle_error(e)
 # RMD
@@ -761,9 +771,7 @@ class HP16CController:
         logger.info("Retrieving remainder")
         try:
             self.stack.remainder()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.update_stack_display()
+            self._refresh_display()
         except HP16CError as e:
             self.handle_error(e)
 
@@ -778,45 +786,23 @@ class HP16CController:
             i_val = self.stack._i_register  # Direct access since get_i not defined
             self.stack.push(i_val)
             self.stack._i_register = top_val  # Direct set since store_in_i not fully implemented
-            self.display.set_entry(self.stack.format_in_base(self.stack.peek(), self.display.mode, pad=False))
-            self.display.raw_value = str(self.stack.peek())
-            self.update_stack_display()
+            self.display.raw_value = self._refresh_display()
         except HP16CError as e:
             self.handle_error(e)
 # SB
     def set_bit(self, bit_index: int) -> None:
         """Set a bit in X and update display."""
-        logger.info(f"Setting bit: {bit_index}")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.set_bit(bit_index)  # Now implemented
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        logger.info("Setting bit: %s", bit_index)
+        self._x_op(self.stack.set_bit, bit_index)
 # CB
     def clear_bit(self, bit_index: int) -> None:
         """Clear a bit in X and update display."""
-        logger.info(f"Clearing bit: {bit_index}")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.clear_bit(bit_index)  # Now implemented
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        logger.info("Clearing bit: %s", bit_index)
+        self._x_op(self.stack.clear_bit, bit_index)
 # B?
     def test_bit(self, bit_index: int) -> int:
         """Test a bit in X and display result."""
-        logger.info(f"Testing bit: {bit_index}")
+        logger.info("Testing bit: %s", bit_index)
         try:
             if self.is_user_entry:
                 self.finalize_entry()
@@ -826,28 +812,26 @@ class HP16CController:
             self.stack_lift_enabled = False  # No stack lift after test
             self.update_stack_display()
             # Restore original X after 1 second (HP-16C behavior)
-            original_x = self.stack.peek()
-            original_str = self.stack.format_in_base(original_x, self.display.mode, pad=False)
-            self.display.master.after(1000, lambda: self.display.set_entry(original_str, blink=False))
+            self._schedule_restore(self._fmt(self._peek(), self.display.mode, pad=False))
             return result
         except HP16CError as e:
             self.handle_error(e)
             return 0
+    def _schedule_restore(self, text: str) -> None:
+        """Show text again after a second (B?/F? result display); a newer request replaces a pending one."""
+        master = self.display.master
+        if self._restore_after_id is not None:
+            master.after_cancel(self._restore_after_id)
+        self._restore_after_id = master.after(1000, self._restore_entry, text)
+
+    def _restore_entry(self, text: str) -> None:
+        self._restore_after_id = None
+        self._set_entry(text, raw=False, blink=False)
 # BIT Related
     def count_bits(self) -> None:
         """Count 1 bits in X and update display."""
         logger.info("Counting bits")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.count_bits()  # Now implemented
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._x_op(self.stack.count_bits)
 
 ### f MODE ROW 3 ###
 
@@ -866,21 +850,15 @@ class HP16CController:
         logger.info("Recalling I register")
         try:
             self.stack.push(self.stack._i_register)
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.display.raw_value = str(top_val)
-            self.update_stack_display()
+            self.display.raw_value = self._refresh_display()
         except HP16CError as e:
             self.handle_error(e)
 # SET COMPL
     def set_complement_mode(self, mode: str) -> None:
-        logger.info(f"Setting complement mode: {mode}")
+        logger.info("Setting complement mode: %s", mode)
         try:
             self.stack.set_complement_mode(mode)
-            self.update_stack_display()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.display.raw_value = str(top_val)
+            self.display.raw_value = self._refresh_display()
         except (HP16CError, ValueError) as e:
             self.handle_error(HP16CError(str(e), "E01"))
 
@@ -889,12 +867,10 @@ class HP16CController:
 # WSIZE
     def set_word_size(self, bits: int) -> None:
         """Set word size and update display (fixed: confirmed present and functional)."""
-        logger.info(f"Setting word size to {bits}")
+        logger.info("Setting word size to %s", bits)
         try:
             self.stack.set_word_size(bits)  # Calls Stack.set_word_size, which is defined
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False))
-            self.update_stack_display()
+            self._refresh_display()
             self.is_user_entry = False
         except HP16CError as e:
             self.handle_error(e)
@@ -906,87 +882,64 @@ class HP16CController:
     def left_justify(self) -> None:
         """Left justify X and update display."""
         logger.info("Left justifying X")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.left_justify()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._x_op(self.stack.left_justify)
 # ABS
     def absolute(self) -> None:
         """Set X to its absolute value and update display."""
         logger.info("Computing absolute value")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.absolute()  # Now implemented
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._x_op(self.stack.absolute)
 # DBL÷
     def double_divide(self) -> None:
         """Perform double divide and update display."""
         logger.info("Double dividing")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.double_divide()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._x_op(self.stack.double_divide)
 
 ### g MODE ROW 2 ###
 
 # LBL
-    def build_labels(self) -> None:
-        """Map program labels to line numbers."""
-        self.labels = {}
-        for i, cmd in enumerate(self.program_memory):
-            if isinstance(cmd, str) and cmd.startswith("LBL "):
-                self.labels[cmd.split()[1]] = i
+    def record_label(self, label: str) -> None:
+        """Append LBL <label> in program mode and index it, so GSB does not need a rescan."""
+        instruction = f"LBL {label}"
+        self.program_memory.append(instruction)
+        self._program_dirty = True
+        step = len(self.program_memory)
+        self.labels[label] = step - 1
+        program_logger.info("%03d - %s (%s)", step, instruction, label)
+        self.display.set_entry((step, f"43 22 {label}"), program_mode=True)
+        self.last_program_step = step
+
+    def forget_label(self, label: str) -> None:
+        """Unindex a LBL step removed by BST/BSP; an earlier LBL with the same name takes over."""
+        self.labels.pop(label, None)
+        instruction = f"LBL {label}"
+        for i in range(len(self.program_memory) - 1, -1, -1):
+            if self.program_memory[i] == instruction:
+                self.labels[label] = i
+                break
 # SF
     def set_flag(self, flag_num: int) -> None:
         """Set a flag."""
-        logger.info(f"Setting flag: {flag_num}")
+        logger.info("Setting flag: %s", flag_num)
         try:
             self.stack.set_flag(flag_num)
-            self.update_stack_display()
-            self.display.update_stack_content()
-            current_val = self.stack.peek()
-            formatted_value = self.stack.format_in_base(current_val, self.display.mode, pad=False)
-            self.display.set_entry(formatted_value)
-            self.display.raw_value = formatted_value
+            self._after_flag_change()
             self.is_user_entry = False
             self.stack_lift_enabled = True
         except HP16CError as e:
             self.handle_error(e)
         except ValueError:
             self.handle_error(HP16CError(f"Invalid flag number: {flag_num}", "E01"))
+
+    def _after_flag_change(self) -> None:
+        """Redraw X and the status line after SF/CF; update_stack_display already refreshes flags."""
+        self.display.raw_value = self._refresh_display()
 # CF
     def clear_flag(self, flag_num: int) -> None:
         """Clear a flag."""
-        logger.info(f"Clearing flag: {flag_num}")
+        logger.info("Clearing flag: %s", flag_num)
         try:
             self.stack.clear_flag(flag_num)
-            self.update_stack_display()
-            self.display.update_stack_content()
-            current_val = self.stack.peek()
-            formatted_value = self.stack.format_in_base(current_val, self.display.mode, pad=False)
-            self.display.set_entry(formatted_value)
-            self.display.raw_value = formatted_value
+            self._after_flag_change()
         except HP16CError as e:
             self.handle_error(e)
         except ValueError:
@@ -994,7 +947,7 @@ class HP16CController:
 # F?
     def test_flag(self, flag_type: Union[str, int]) -> Union[int, bool]:
         """Test a flag."""
-        logger.info(f"Testing flag: {flag_type}")
+        logger.info("Testing flag: %s", flag_type)
         try:
             if flag_type == "CF":
                 # Fix: get_carry_flag not defined, use test_flag(4) for carry
@@ -1011,50 +964,102 @@ class HP16CController:
     def double_multiply(self) -> None:
         """Perform double multiply and update display."""
         logger.info("Double multiplying")
-        try:
-            if self.is_user_entry:
-                self.finalize_entry()
-            self.stack.double_multiply()
-            top_val = self.stack.peek()
-            self.display.set_entry(self.stack.format_in_base(top_val, self.display.mode, pad=False), blink=True)
-            self.is_user_entry = False
-            self.stack_lift_enabled = True
-            self.update_stack_display()
-        except HP16CError as e:
-            self.handle_error(e)
+        self._x_op(self.stack.double_multiply)
 
 ### G MODE ROW 3 ###
 
 # P/R
-    def run_program(self) -> None:
-        """Execute program."""
+    def _compile_program(self) -> None:
+        """Translate program_memory into (opcode, arg) pairs, one per step, resolving labels to line numbers."""
+        if not self._program_dirty:
+            return
+        self._program_dirty = False
+        compiled: List[Tuple[int, Any]] = []
+        for cmd in self.program_memory:
+            if not isinstance(cmd, str):
+                compiled.append((OP_NOP, None))
+            elif cmd.startswith("enter_digit"):
+                compiled.append((OP_DIGIT, cmd.split()[1]))
+            elif cmd.startswith("enter_operator"):
+                compiled.append((OP_OPERATOR, cmd.split()[1]))
+            elif cmd == "ENTER" or cmd.startswith("enter_value"):
+                compiled.append((OP_ENTER, None))
+            elif cmd in BASE_KEYCODES:
+                compiled.append((OP_BASE, cmd))
+            elif cmd.startswith("goto"):
+                compiled.append((OP_GOTO, cmd.split()[1]))
+            elif cmd.startswith("GSB "):
+                compiled.append((OP_GSB, cmd.split()[1]))
+            elif cmd == "RTN":
+                compiled.append((OP_RTN, None))
+            else:
+                compiled.append((OP_NOP, None))
+        # Resolve goto/GSB labels to line numbers once; unknown labels stay None and error at run time
+        self._ops = array('B', [op for op, _ in compiled])
+        self._args = [self.labels.get(arg) if op in (OP_GOTO, OP_GSB) else arg for op, arg in compiled]
+        # Fixed return slots: nesting depth, not the number of GSB steps, bounds it (a subroutine can call itself)
+        self._ret = array('i', [0] * MAX_RETURN_DEPTH)
+        self._retsp = 0
+
+    def run_program(self, label: Optional[str] = None) -> None:
+        """Execute the program from the top, or from LBL label (keyboard GSB) until its RTN."""
         if self.program_mode:
             return
-        self.build_labels()
-        self.current_line = 0
-        self.return_stack = []
-        while self.current_line < len(self.program_memory):
-            cmd = self.program_memory[self.current_line]
-            if isinstance(cmd, tuple):
-                pass
-            elif isinstance(cmd, str):
-                if cmd.startswith("enter_digit"):
-                    self.enter_digit(cmd.split()[1])
-                elif cmd.startswith("enter_operator"):
-                    self.enter_operator(cmd.split()[1])
-                elif cmd.startswith("enter_value"):
-                    self.enter_value()
-                elif cmd.startswith("LBL "):
-                    pass
-                elif cmd.startswith("goto"):
-                    label = cmd.split()[1]
-                    if label in self.labels:
-                        self.current_line = self.labels[label]
-                        continue
-                    else:
+        self._compile_program()
+        if label is None:
+            start = 0
+        else:
+            start = self.labels.get(label)
+            if start is None:
+                self.handle_error(HP16CError("No such label", "E04"))
+                return
+        ops = self._ops
+        args = self._args
+        n = len(ops)
+        handlers = self._op_handlers
+        # The program counter and return stack pointer live in locals for the loop and are stored back after
+        ret = self._ret
+        depth = len(ret)
+        line = start
+        sp = 0
+        # Steps that touch the display only queue their redraws and blink; the batch flushes them once at the end
+        with self.display.batch():
+            while line < n:
+                op = ops[line]
+                handler = handlers[op]
+                if handler is not None:
+                    handler(args[line])
+                elif op == OP_GOTO:
+                    arg = args[line]
+                    if arg is None:
                         self.display.set_error("Label not found")
                         break
-            self.current_line += 1
+                    line = arg
+                    continue
+                elif op == OP_GSB:
+                    arg = args[line]
+                    if arg is None:
+                        self.display.set_error("Label not found")
+                        break
+                    if sp == depth:
+                        self.handle_error(HP16CError("Subroutine level too deep", "E05"))
+                        break
+                    ret[sp] = line + 1
+                    sp += 1
+                    line = arg
+                    continue
+                elif op == OP_RTN:
+                    if sp == 0:
+                        break  # RTN with no pending call ends the program
+                    sp -= 1
+                    line = ret[sp]
+                    continue
+                line += 1
+            self.current_line = line
+            self._retsp = sp
+            if not self.display.is_error_displayed:
+                # Steps only queued their redraws inside the batch; show the final X once
+                self._refresh_display()
 # CLX
     def clear_x(self) -> None:
         """Clear X register."""
@@ -5,15 +5,20 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/06/2025
-Dependencies: Python 3.6+, tkinter, tkinter.font, stack, logging_config
+Dependencies: Python 3.6+, contextlib, tkinter, tkinter.font, stack, logging_config
 """
 
-from typing import Optional, Union, Tuple
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union, Tuple
 import tkinter as tk
 import tkinter.font as tkFont
-from stack import Stack
+from stack import Stack, format_float
 from logging_config import logger
 
+# Status-line annunciator for each display base, and the complement-mode code shown beside the word size
+_MODE_CHARS = {"HEX": "h", "DEC": "d", "OCT": "o", "BIN": "b", "FLOAT": "f"}
+_COMPLEMENT_CODES = {"UNSIGNED": "00", "1S": "01", "2S": "02"}
+
 class Display:
     def __init__(self, master: tk.Tk, stack: Stack, x: int, y: int, width: int, height: int,
                  border_thickness: int = 1, font: Optional[tkFont.Font] = None,
@@ -28,6 +33,7 @@ class Display:
         self.current_value = 0
         self.full_width = width
         self.last_stack_info = ""
+        self._drawn_status: Optional[tuple] = None  # What update_stack_content last drew; None forces a redraw
         self.error_displayed = False
         self.result_displayed = False
         self.show_stack = False
@@ -36,13 +42,20 @@ class Display:
         self.full_entry = "0"
         self.is_digit_entry = False
         self.decimal_places = None
+        self._batch_depth = 0  # > 0 while inside batch(); redraws are deferred
+        self._pending_stack = False
+        self._pending_idle = False
+        self._pending_blink = False
 
         self.font = font if font else tkFont.Font(family="Calculator", size=10)
-        logger.info(f"Display font set to: family={self.font.actual()['family']}, size={self.font.actual()['size']}")
+        logger.info("Display font set to: family=%s, size=%s", self.font.actual()['family'], self.font.actual()['size'])
 
         self.frame = tk.Frame(master, bg="#9C9C9C", highlightthickness=border_thickness,
                               highlightbackground="white", relief="flat")
         self.frame.place(x=x, y=y, width=width+25, height=height)
+        # Last known frame position/size, kept current by <Configure> so callers need not query Tk
+        self._cached_geom: Tuple[int, int, int, int] = (x, y, width+25, height)
+        self.frame.bind("<Configure>", self._on_display_configure)
 
         self.widget = tk.Label(self.frame, text=self.current_entry, bg="#9C9C9C", fg="black",
                                font=self.font, anchor="e")
@@ -115,7 +128,7 @@ class Display:
         formatted_value = self.stack.format_in_base(num, new_base, pad=False)
         self.raw_value = formatted_value
         self.set_entry(formatted_value, raw=True)
-        logger.info(f"Base set to {new_base}, converted value to '{formatted_value}'")
+        logger.info("Base set to %s, converted value to '%s'", new_base, formatted_value)
 
     def set_entry(self, entry: Union[str, Tuple[int, str]], raw: bool = False,
                   program_mode: bool = False, blink: bool = True, is_error: bool = False) -> None:
@@ -131,7 +144,7 @@ class Display:
             blink: Whether to blink the display after updating.
             is_error: If True, display the full error message without truncation.
         """
-        logger.info(f"Setting entry: value={entry}, raw={raw}, program_mode={program_mode}, blink={blink}, is_error={is_error}")
+        logger.info("Setting entry: value=%s, raw=%s, program_mode=%s, blink=%s, is_error=%s", entry, raw, program_mode, blink, is_error)
 
         if is_error:
             # Display the full error message without applying the character limit
@@ -151,13 +164,13 @@ class Display:
                     visible_text = self.full_entry.rjust(self.max_display_chars)
                     has_left = False
                     has_right = False
-                logger.info(f"Raw mode: full_entry={self.full_entry}, visible_text={visible_text}, "
-                            f"has_left={has_left}, has_right={has_right}")
+                logger.info("Raw mode: full_entry=%s, visible_text=%s, "
+                            "has_left=%s, has_right=%s", self.full_entry, visible_text, has_left, has_right)
                 self.widget.config(text=visible_text, anchor="e")
                 self.widget.place(x=-25, y=0, width=self.full_width-30, height=self.frame.winfo_height()-2)
                 self.mode_label.config(text=self.get_mode_char(self.mode, has_left, has_right))
                 displayed_text = self.widget.cget("text")
-                logger.info(f"Displayed text (widget): '{displayed_text}'")
+                logger.info("Displayed text (widget): '%s'", displayed_text)
             elif program_mode:
                 # Program mode: Display step and instruction
                 step, instruction = entry
@@ -174,7 +187,7 @@ class Display:
                 self.is_error_displayed = False
                 self.error_displayed = False
                 displayed_text = self.widget.cget("text")
-                logger.info(f"Displayed text (widget): '{displayed_text}'")
+                logger.info("Displayed text (widget): '%s'", displayed_text)
             else:
                 # Default mode: Format and display stack value or provided entry
                 self.is_error_displayed = False
@@ -198,7 +211,7 @@ class Display:
                             if self.decimal_places is not None:
                                 entry_str = f"{val:,.{self.decimal_places}f}"
                             else:
-                                entry_str = f"{val:,.9f}".rstrip('0').rstrip('.')
+                                entry_str = format_float(val, commas=True)
                                 if '.' not in entry_str:
                                     entry_str += '.0'
                         else:
@@ -228,18 +241,50 @@ class Display:
                     current_mode_text = self.mode_label.cget("text")
                     new_mode_text = self.get_mode_char(self.mode, has_left, has_right)
                     if current_mode_text != new_mode_text:
-                        logger.info(f"Mode indicator changed from '{current_mode_text}' to '{new_mode_text}' "
-                                   f"(has_left={has_left}, has_right={has_right})")
+                        logger.info("Mode indicator changed from '%s' to '%s' "
+                                   "(has_left=%s, has_right=%s)", current_mode_text, new_mode_text, has_left, has_right)
                     self.mode_label.config(text=new_mode_text)
                 displayed_text = self.widget.cget("text") if self.mode != "FLOAT" else self.float_widget.cget("text")
-                logger.info(f"Displayed text (widget): '{displayed_text}'")
-                self.widget.update_idletasks() if self.mode != "FLOAT" else self.float_widget.update_idletasks()
+                logger.info("Displayed text (widget): '%s'", displayed_text)
+                if self._batch_depth:
+                    self._pending_idle = True
+                else:
+                    self.widget.update_idletasks() if self.mode != "FLOAT" else self.float_widget.update_idletasks()
 
             if blink and not self.is_digit_entry:
-                self.blink()
+                if self._batch_depth:
+                    self._pending_blink = True  # One blink for the final text, not one per intermediate entry
+                else:
+                    self.blink()
             self.is_digit_entry = False
             self.update_stack_content()
 
+    def _on_display_configure(self, event: tk.Event) -> None:
+        self._cached_geom = (event.x, event.y, event.width, event.height)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer stack-info and idle redraws and blinks until the outermost batch exits, then flush once."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._flush()
+
+    def _flush(self) -> None:
+        """Run the redraws requested while batching."""
+        if self._pending_stack:
+            self._pending_stack = False
+            self.update_stack_content()
+        if self._pending_idle:
+            self._pending_idle = False
+            self.widget.update_idletasks() if self.mode != "FLOAT" else self.float_widget.update_idletasks()
+        if self._pending_blink:
+            self._pending_blink = False
+            self.blink()
+
     def get_visible_text(self) -> str:
         """Get the visible text, ensuring the rightmost max_display_chars are shown."""
         effective_start = len(self.full_entry) - self.max_display_chars - self.display_offset
@@ -251,14 +296,14 @@ class Display:
                 return " " * self.max_display_chars
             visible_chars = min(self.max_display_chars - pad_spaces, len(self.full_entry))
             visible_part = self.full_entry[-visible_chars:]  # Always take rightmost characters
-            logger.debug(f"get_visible_text: full_entry={self.full_entry}, effective_start={effective_start}, "
-                         f"pad_spaces={pad_spaces}, visible_chars={visible_chars}, visible_part={visible_part}")
+            logger.debug("get_visible_text: full_entry=%s, effective_start=%s, "
+                         "pad_spaces=%s, visible_chars=%s, visible_part=%s", self.full_entry, effective_start, pad_spaces, visible_chars, visible_part)
             return visible_part.ljust(self.max_display_chars)  # Remove left padding, right-justify
         else:
             start = effective_start
             end = min(start + self.max_display_chars, len(self.full_entry))
             visible_text = self.full_entry[start:end]
-            logger.debug(f"get_visible_text: full_entry={self.full_entry}, start={start}, end={end}, visible_text={visible_text}")
+            logger.debug("get_visible_text: full_entry=%s, start=%s, end=%s, visible_text=%s", self.full_entry, start, end, visible_text)
             return visible_text.ljust(self.max_display_chars)
 
     def show_f_mode(self) -> None:
@@ -316,8 +361,7 @@ class Display:
         logger.info("All visible display elements blinked")
 
     def get_mode_char(self, mode: str, has_left: bool = False, has_right: bool = False) -> str:
-        mode_map = {"HEX": "h", "DEC": "d", "OCT": "o", "BIN": "b", "FLOAT": "f"}
-        base_char = mode_map.get(mode, "d")
+        base_char = _MODE_CHARS.get(mode, "d")
         if has_left and has_right:
             return f".{base_char}."
         elif has_left:
@@ -335,8 +379,9 @@ class Display:
         self.prgm_label.place_forget()
         self.flag_4_label.place_forget()
         self.flag_5_label.place_forget()
+        self._drawn_status = None  # C/G were hidden; the next status update must place them again
         self.widget.place(x=0, y=0, width=self.full_width-30, height=self.frame.winfo_height()-2)
-        logger.info(f"Error displayed: {error_message}")
+        logger.info("Error displayed: %s", error_message)
         self.master.after(3000, self.reset_error)
 
     def reset_error(self) -> None:
@@ -388,7 +433,7 @@ class Display:
         has_left = len(self.full_entry) > self.max_display_chars and self.display_offset < (len(self.full_entry) - self.max_display_chars)
         has_right = self.display_offset > 0
         self.mode_label.config(text=self.get_mode_char(self.mode, has_left, has_right))
-        logger.info(f"Scrolled right: offset={self.display_offset}, text='{visible_text}'")
+        logger.info("Scrolled right: offset=%s, text='%s'", self.display_offset, visible_text)
 
     def scroll_left(self) -> None:
         if self.display_offset > 0:
@@ -400,7 +445,7 @@ class Display:
             has_left = len(self.full_entry) > self.max_display_chars and self.display_offset < (len(self.full_entry) - self.max_display_chars)
             has_right = self.display_offset > 0
             self.mode_label.config(text=self.get_mode_char(self.mode, has_left, has_right))
-            logger.info(f"Scrolled left: offset={self.display_offset}, text='{visible_text}'")
+            logger.info("Scrolled left: offset=%s, text='%s'", self.display_offset, visible_text)
 
     def clear_entry(self) -> None:
         logger.info("Clearing entry")
@@ -412,7 +457,7 @@ class Display:
         self.result_displayed = False
 
     def append_entry(self, ch: str) -> None:
-        logger.info(f"Appending character: {ch}")
+        logger.info("Appending character: %s", ch)
         if self.error_displayed:
             self.clear_entry()
         if self.result_displayed or not self.raw_value:
@@ -427,7 +472,7 @@ class Display:
 
     def set_mode(self, mode_str: str) -> None:
         """Set the display mode."""
-        logger.info(f"Setting mode: {mode_str}")
+        logger.info("Setting mode: %s", mode_str)
         self.mode = mode_str
         self.mode_label.config(text=self.get_mode_char(mode_str))
         self.update_stack_content()
@@ -439,16 +484,26 @@ class Display:
         self.widget.config(text=visible_text)
 
     def update_stack_content(self) -> None:
-        complement_mode = self.stack.get_complement_mode()
-        word_size = self.stack.get_word_size()
-        flags_bitfield = self.stack.get_flags_bitfield()
-        complement_code = {"UNSIGNED": "00", "1S": "01", "2S": "02"}
-        comp_str = complement_code.get(complement_mode, "00")
+        if self._batch_depth:
+            self._pending_stack = True
+            return
+        stack = self.stack
+        flags = stack._flags
+        # Runs after every operation, so the change check reads plain attributes rather than calling getters
+        status = (stack.complement_mode, stack.word_size, flags[0], flags[1], flags[2], flags[3], flags[4], flags[5],
+                  self._cached_geom[3])
+        if status == self._drawn_status:
+            return  # Status line already shows this state; skip the Tk config/place round-trips
+        self._drawn_status = status
+        complement_mode = stack.complement_mode
+        word_size = stack.word_size
+        flags_bitfield = stack.get_flags_bitfield()
+        comp_str = _COMPLEMENT_CODES.get(complement_mode, "00")
         stack_info = f"{comp_str}-{word_size:02d}-{flags_bitfield:04b}"
         self.word_size_label.config(text=stack_info)
         self.word_size_label.place(**self.word_size_config)
         if stack_info != self.last_stack_info:
-            logger.info(f"Stack info updated: {stack_info}")
+            logger.info("Stack info updated: %s", stack_info)
             self.last_stack_info = stack_info
         # Show Carry flag (C)
         if self.stack.test_flag(4):
@@ -461,12 +516,12 @@ class Display:
             self.flag_5_label.place_forget()
 
     def toggle_stack_display(self, mode: Optional[str] = None) -> None:
-        logger.info(f"Toggling stack display: show={not self.show_stack}, mode={mode}")
+        logger.info("Toggling stack display: show=%s, mode=%s", not self.show_stack, mode)
         self.show_stack = not self.show_stack
         if self.show_stack and mode:
             stack_state = self.stack.get_state()
             word_size = self.stack.get_word_size()
-            mask = (1 << word_size) - 1
+            mask = self.stack._mask
             if mode == "BIN":
                 formatted_stack = [format(int(x) & mask, f"0{word_size}b") for x in stack_state]
             elif mode == "OCT":
@@ -487,11 +542,11 @@ class Display:
                 padding = max(0, (word_size + 3) // 4)
                 formatted_stack = [format(int(x) & mask, f"0{padding}X").lower() for x in stack_state]
             elif mode == "FLOAT":
-                formatted_stack = [f"{float(x):.9f}".rstrip("0").rstrip(".") for x in stack_state]
+                formatted_stack = [format_float(x) for x in stack_state]
             else:
                 formatted_stack = [str(x) for x in stack_state]
             self.stack_content.config(text=f"Stack: {formatted_stack}")
-            logger.info(f"Stack displayed: {formatted_stack}")
+            logger.info("Stack displayed: %s", formatted_stack)
         else:
             self.stack_content.config(text="")
             logger.info("Stack display hidden")
\ No newline at end of file
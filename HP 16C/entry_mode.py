@@ -0,0 +1,22 @@
+"""
+entry_mode.py
+Defines the pending-entry modes used by the controller when a key waits for a digit (STO, RCL, SF, ...).
+Author: GlobeyCode
+License: MIT
+Created: 4/06/2025
+Last Modified: 4/06/2025
+Dependencies: Python 3.6+, enum
+"""
+
+from enum import IntEnum
+
+class EntryMode(IntEnum):
+    """What the next digit key means; controller.entry_mode is None when digits are ordinary input."""
+    STO = 0
+    RCL = 1
+    SET_FLAG = 2
+    CLEAR_FLAG = 3
+    TEST_FLAG = 4
+    SET_DECIMAL_PLACES = 5
+    GSB_LABEL = 6
+    LABEL = 7
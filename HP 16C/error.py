@@ -17,7 +17,7 @@ class HP16CError(Exception):
         self.message = message
         self.display = display
         super().__init__(f"{self.error_code}: {self.message}")
-        logger.info(f"Raising error: {self.display_message}")
+        logger.info("Raising error: %s", self.display_message)
         if self.display and hasattr(self.display, 'mode_label'):
             self.display.mode_label.place_forget()
 
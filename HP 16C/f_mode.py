@@ -5,14 +5,14 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/06/2025
-Dependencies: Python 3.6+, sys, os, buttons, stack, error, logging_config
+Dependencies: Python 3.6+, sys, os, stack, entry_mode, error, logging_config
 """
 
 from typing import Any, Dict, Callable
 import sys
 import os
-import buttons
 import stack
+from entry_mode import EntryMode
 from error import HP16CError, IncorrectWordSizeError, NoValueToShiftError, ShiftExceedsWordSizeError, InvalidBitOperationError, StackUnderflowError, DivisionByZeroError, InvalidOperandError, NegativeShiftCountError
 from logging_config import logger, program_logger
 
@@ -45,63 +45,57 @@ def action_rotate_right(display_widget: Any, controller_obj: Any) -> None:
 
 def action_rotate_left_n(display_widget: Any, controller_obj: Any) -> None:
     """Rotate Y left by X bits with carry (RLn)."""
+    stack = controller_obj.stack
     try:
         if controller_obj.is_user_entry:
             controller_obj.finalize_entry()
-        if len(controller_obj.stack._stack) < 1:
+        if len(stack._stack) < 1:
             raise StackUnderflowError("Need Y value for RLn")
-        n = controller_obj.stack.pop()  # X = rotation count
-        y = controller_obj.stack.pop()  # Y = operand
-        if n < 0 or n >= controller_obj.stack.word_size:
+        n = stack.pop()  # X = rotation count
+        y = stack.pop()  # Y = operand
+        word_size = stack.word_size
+        if n < 0 or n >= word_size:
             raise NegativeShiftCountError("Invalid rotation count", "E108")
-        mask = (1 << controller_obj.stack.word_size) - 1
-        carry_in = 1 if controller_obj.stack.test_flag(4) else 0
-        rotated = ((y << n) | (y >> (controller_obj.stack.word_size - n)) | (carry_in << (n - 1))) & mask
-        carry_out = 1 if (y & (1 << (controller_obj.stack.word_size - n))) else 0
-        controller_obj.stack._x_register = rotated
+        mask = stack._mask
+        carry_in = 1 if stack.test_flag(4) else 0
+        rotated = ((y << n) | (y >> (word_size - n)) | (carry_in << (n - 1))) & mask
+        carry_out = 1 if (y & (1 << (word_size - n))) else 0
+        stack._x_register = rotated
         if carry_out:
-            controller_obj.stack.set_flag(4)
+            stack.set_flag(4)
         else:
-            controller_obj.stack.clear_flag(4)
-        top_val = controller_obj.stack.peek()
-        display_widget.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False),
-            blink=True
-        )
-        controller_obj.update_stack_display()
+            stack.clear_flag(4)
+        controller_obj._refresh_display()
         controller_obj.is_user_entry = False
-        logger.info(f"Rotated Y={y} left with carry by {n}: {rotated} (word_size={controller_obj.stack.word_size}, carry_in={carry_in}, carry_out={carry_out})")
+        logger.info("Rotated Y=%s left with carry by %s: %s (word_size=%s, carry_in=%s, carry_out=%s)", y, n, rotated, word_size, carry_in, carry_out)
     except HP16CError as e:
         controller_obj.handle_error(e)
 
 def action_rotate_right_n(display_widget: Any, controller_obj: Any) -> None:
     """Rotate Y right by X bits with carry (RRn)."""
+    stack = controller_obj.stack
     try:
         if controller_obj.is_user_entry:
             controller_obj.finalize_entry()
-        if len(controller_obj.stack._stack) < 1:
+        if len(stack._stack) < 1:
             raise StackUnderflowError("Need Y value for RRn")
-        n = controller_obj.stack.pop()  # X = rotation count
-        y = controller_obj.stack.pop()  # Y = operand
-        if n < 0 or n >= controller_obj.stack.word_size:
+        n = stack.pop()  # X = rotation count
+        y = stack.pop()  # Y = operand
+        word_size = stack.word_size
+        if n < 0 or n >= word_size:
             raise NegativeShiftCountError("Invalid rotation count", "E108")
-        mask = (1 << controller_obj.stack.word_size) - 1
-        carry_in = 1 if controller_obj.stack.test_flag(4) else 0
-        rotated = ((y >> n) | (y << (controller_obj.stack.word_size - n)) | (carry_in << (controller_obj.stack.word_size - n - 1))) & mask
+        mask = stack._mask
+        carry_in = 1 if stack.test_flag(4) else 0
+        rotated = ((y >> n) | (y << (word_size - n)) | (carry_in << (word_size - n - 1))) & mask
         carry_out = 1 if (y & (1 << (n - 1))) else 0
-        controller_obj.stack._x_register = rotated
+        stack._x_register = rotated
         if carry_out:
-            controller_obj.stack.set_flag(4)
+            stack.set_flag(4)
         else:
-            controller_obj.stack.clear_flag(4)
-        top_val = controller_obj.stack.peek()
-        display_widget.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False),
-            blink=True
-        )
-        controller_obj.update_stack_display()
+            stack.clear_flag(4)
+        controller_obj._refresh_display()
         controller_obj.is_user_entry = False
-        logger.info(f"Rotated Y={y} right with carry by {n}: {rotated} (word_size={controller_obj.stack.word_size}, carry_in={carry_in}, carry_out={carry_out})")
+        logger.info("Rotated Y=%s right with carry by %s: %s (word_size=%s, carry_in=%s, carry_out=%s)", y, n, rotated, word_size, carry_in, carry_out)
     except HP16CError as e:
         controller_obj.handle_error(e)
 
@@ -110,11 +104,7 @@ def action_mask_left(display_widget: Any, controller_obj: Any) -> None:
         if len(controller_obj.stack._stack) < 1:
             raise StackUnderflowError("Need Y value for MASKL")
         controller_obj.stack.mask_left(controller_obj.stack.peek())
-        top_val = controller_obj.stack.peek()
-        display_widget.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False)
-        )
-        controller_obj.update_stack_display()
+        controller_obj._refresh_display()
         controller_obj.is_user_entry = False  # Explicitly reset
         controller_obj.display.raw_value = ""  # Clear stale raw_value
     except HP16CError as e:
@@ -125,11 +115,7 @@ def action_mask_right(display_widget: Any, controller_obj: Any) -> None:
         if len(controller_obj.stack._stack) < 1:
             raise StackUnderflowError("Need Y value for MASKR")
         controller_obj.stack.mask_right(controller_obj.stack.peek())
-        top_val = controller_obj.stack.peek()
-        display_widget.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False)
-        )
-        controller_obj.update_stack_display()
+        controller_obj._refresh_display()
         controller_obj.is_user_entry = False
         controller_obj.display.raw_value = ""
         display_widget.clear_entry()  # Reset display state fully
@@ -140,11 +126,7 @@ def action_remainder(display_widget: Any, controller_obj: Any) -> None:
     """Retrieve the remainder from the last division (RMD)."""
     try:
         controller_obj.stack.remainder()
-        top_val = controller_obj.stack.peek()
-        controller_obj.display.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False)
-        )
-        controller_obj.update_stack_display()
+        controller_obj._refresh_display()
     except HP16CError as e:
         controller_obj.handle_error(e)
 
@@ -184,19 +166,17 @@ def action_show(display_widget: Any, controller_obj: Any, mode: str) -> bool:
     # Set the temporary mode and update the display value
     display_widget.set_mode(mode)
     display_widget.hide_f_mode()
-    temp_value_str = controller_obj.stack.format_in_base(current_value, mode, pad=False)
+    temp_value_str = controller_obj._fmt(current_value, mode, pad=False)
     display_widget.set_entry(temp_value_str, raw=True)
 
     # Revert all buttons (except special ones) to normal
-    import buttons  # Avoid circular import issues
-    for btn in controller_obj.buttons:
-        if btn.get("command_name") not in ("yellow_f_function", "blue_g_function"):
-            buttons.revert_to_normal(btn, controller_obj.buttons, display_widget, controller_obj)
+    controller_obj.revert_mode_buttons()
+    controller_obj.f_mode_active = False  # Keys act normally again while the temporary base is shown
 
     # After 2 seconds, revert to the original mode and restore the display value
     def revert_display() -> None:
         display_widget.set_mode(current_mode)
-        original_value_str = controller_obj.stack.format_in_base(current_value, current_mode, pad=False)
+        original_value_str = controller_obj._fmt(current_value, current_mode, pad=False)
         display_widget.set_entry(original_value_str, raw=True)
         controller_obj.f_mode_active = False
 
@@ -256,6 +236,8 @@ def action_clear_program(display_widget: Any, controller_obj: Any) -> None:
     """
     if controller_obj.program_mode:
         controller_obj.program_memory = []
+        controller_obj.labels = {}
+        controller_obj._program_dirty = True
         display_widget.set_entry((0, ""), program_mode=True)
         logger.info("Program memory cleared")
         program_logger.info("PROGRAM CLEARED")
@@ -268,13 +250,11 @@ def action_clear_register(display_widget: Any, controller_obj: Any) -> bool:
     """
     stack.clear_registers()
     logger.info("All data storage registers cleared to zero")
-    for btn in controller_obj.buttons:
-        if btn.get("command_name") not in ("yellow_f_function", "blue_g_function", "reload_program"):
-            buttons.revert_to_normal(btn, controller_obj.buttons, display_widget, controller_obj)
+    controller_obj.revert_mode_buttons()
     controller_obj.f_mode_active = False
     display_widget.hide_f_mode()
     current_value = stack.peek()
-    formatted_value = controller_obj.stack.format_in_base(current_value, display_widget.mode, pad=False)
+    formatted_value = controller_obj._fmt(current_value, display_widget.mode, pad=False)
     display_widget.set_entry(formatted_value, blink=True)
     return True
 
@@ -287,11 +267,9 @@ def action_clear_prefix(display_widget: Any, controller_obj: Any) -> bool:
     controller_obj.g_mode_active = False
     display_widget.hide_f_mode()
     display_widget.hide_g_mode()
-    for btn in controller_obj.buttons:
-        if btn.get("command_name") not in ("yellow_f_function", "blue_g_function", "reload_program"):
-            buttons.revert_to_normal(btn, controller_obj.buttons, display_widget, controller_obj)
+    controller_obj.revert_mode_buttons()
     current_x = controller_obj.stack.peek()
-    formatted_x = controller_obj.stack.format_in_base(current_x, display_widget.mode, pad=False)
+    formatted_x = controller_obj._fmt(current_x, display_widget.mode, pad=False)
     display_widget.set_entry(formatted_x)
     logger.info("Clear Prefix: Reset prefix states, reverted buttons, and refreshed display")
     return True
@@ -325,12 +303,7 @@ def action_set_word_size(display_widget: Any, controller_obj: Any) -> None:
     """Set the word size (WSIZE). Uses X as the bit count."""
     try:
         bits: int = controller_obj.stack.peek()
-        controller_obj.set_word_size(bits)
-        top_val = controller_obj.stack.peek()
-        controller_obj.display.set_entry(
-            controller_obj.stack.format_in_base(top_val, controller_obj.display.mode, pad=False)
-        )
-        controller_obj.update_stack_display()
+        controller_obj.set_word_size(bits)  # Redraws X and the stack itself
     except HP16CError as e:
         controller_obj.handle_error(e)
 
@@ -340,7 +313,7 @@ def action_set_float_mode(display_widget: Any, controller_obj: Any) -> None:
     
     The entry mode is set to "set_decimal_places" and the display is reset.
     """
-    controller_obj.entry_mode = "set_decimal_places"
+    controller_obj.entry_mode = EntryMode.SET_DECIMAL_PLACES
     display_widget.set_entry("0", raw=True, blink=True)
 
 def action_memory_status(display_widget: Any, controller_obj: Any) -> None:
@@ -436,7 +409,7 @@ def f_action(button: Dict[str, Any], display_widget: Any, controller_obj: Any) -
         False indicating no further processing is required.
     """
     top_text: str = button.get("orig_top_text", "").strip().upper()
-    logger.info(f"f-mode action: {top_text}")
+    logger.info("f-mode action: %s", top_text)
     if top_text in F_FUNCTIONS:
         result = F_FUNCTIONS[top_text](display_widget, controller_obj)
         # If the result is not explicitly a boolean (for special cases), reset f-mode.
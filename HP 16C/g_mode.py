@@ -5,13 +5,15 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/01/2025
-Dependencies: Python 3.6+, tkinter (for type hints), sys, os, stack, buttons, error, logging_config
+Dependencies: Python 3.6+, tkinter (for type hints), sys, os, stack, buttons, entry_mode, error, logging_config
 """
 
 from typing import Any, Callable, Dict
 import sys
 import os
 import stack
+from buttons import OPERATOR_KEYCODES, BASE_KEYCODES, PROGRAM_DIGITS
+from entry_mode import EntryMode
 from error import HP16CError, StackUnderflowError, DivisionByZeroError
 from logging_config import logger, program_logger
 
@@ -68,10 +70,8 @@ def action_double_divide(display_widget: Any, controller_obj: Any) -> None:
         if len(controller_obj.stack._stack) < 1:
             raise StackUnderflowError("Need Y value for DBL÷")
         
-        x = controller_obj.stack.peek()  # Divisor
-        controller_obj.stack.pop()       # Pop X
-        y = controller_obj.stack.peek()  # High word
-        controller_obj.stack.pop()       # Pop Y
+        x = controller_obj.stack.pop()  # Divisor
+        y = controller_obj.stack.pop()  # High word
         
         if x == 0:
             raise DivisionByZeroError()
@@ -88,7 +88,7 @@ def action_double_divide(display_widget: Any, controller_obj: Any) -> None:
         controller_obj.stack._last_x = x  # For g LST X
         
         # Display quotient immediately
-        formatted_quotient = controller_obj.stack.format_in_base(quotient, controller_obj.display.mode, pad=False)
+        formatted_quotient = controller_obj._fmt(quotient, controller_obj.display.mode, pad=False)
         display_widget.set_entry(formatted_quotient, blink=True)
         
         # Schedule remainder display after 2 seconds
@@ -113,7 +113,7 @@ def action_double_divide(display_widget: Any, controller_obj: Any) -> None:
         controller_obj.is_user_entry = False
         controller_obj.stack_lift_enabled = True
         
-        logger.info(f"DBL÷: {y} << {word_size} = {dividend} ÷ {divisor} = {quotient}, remainder={remainder}")
+        logger.info("DBL÷: %s << %s = %s ÷ %s = %s, remainder=%s", y, word_size, dividend, divisor, quotient, remainder)
     except HP16CError as e:
         controller_obj.handle_error(e)
 
@@ -129,6 +129,7 @@ def action_return(display_widget: Any, controller_obj: Any) -> None:
     """
     if controller_obj.program_mode:
         controller_obj.program_memory.append("RTN")
+        controller_obj._program_dirty = True
         controller_obj.display.set_entry(f"P {len(controller_obj.program_memory):03d}")
     else:
         # In run mode, implement subroutine return logic if needed.
@@ -140,7 +141,7 @@ def action_label(display_widget: Any, controller_obj: Any) -> None:
     In program mode, set the entry mode to label.
     """
     if controller_obj.program_mode:
-        controller_obj.entry_mode = "label"
+        controller_obj.entry_mode = EntryMode.LABEL
     else:
         # For run mode, additional handling may be added.
         pass
@@ -170,26 +171,23 @@ def action_reciprocal(display_widget: Any, controller_obj: Any) -> None:
             return
         result = 1 / val if controller_obj.display.mode == "FLOAT" else int(1 / val)
         controller_obj.stack._x_register = result  # Update X directly
-        new_str = controller_obj.stack.format_in_base(result, controller_obj.display.mode, pad=False)
-        display_widget.set_entry(new_str)
-        display_widget.raw_value = new_str
-        controller_obj.update_stack_display()
+        display_widget.raw_value = controller_obj._refresh_display()
     except HP16CError as e:
         controller_obj.handle_error(e)
 
 def action_set_flag(display_widget: Any, controller_obj: Any) -> None:
     """Initiate setting a flag (SF). Waits for digit input (0-5)."""
-    controller_obj.entry_mode = "set_flag"
+    controller_obj.entry_mode = EntryMode.SET_FLAG
     logger.info("Entered set_flag mode awaiting flag number (0-5)")
 
 def action_clear_flag(display_widget: Any, controller_obj: Any) -> None:
     """Initiate clearing a flag (CF). Waits for digit input (0-5)."""
-    controller_obj.entry_mode = "clear_flag"
+    controller_obj.entry_mode = EntryMode.CLEAR_FLAG
     logger.info("Entered clear_flag mode awaiting flag number (0-5)")
 
 def action_test_flag(display_widget: Any, controller_obj: Any) -> None:
     """Initiate testing a flag (F?). Waits for digit input (0-5)."""
-    controller_obj.entry_mode = "test_flag"
+    controller_obj.entry_mode = EntryMode.TEST_FLAG
     logger.info("Entered test_flag mode awaiting flag number (0-5)")
 
 def action_double_multiply(display_widget: Any, controller_obj: Any) -> None:
@@ -217,16 +215,14 @@ def action_toggle_program_run(display_widget: Any, controller_obj: Any) -> None:
             last_step = len(controller_obj.program_memory) - 1
             if last_step >= 0 and controller_obj.program_memory:
                 last_instruction = controller_obj.program_memory[last_step]
-                op_map = {"÷": "10", "×": "20", "-": "30", "+": "40", ".": "48", "ENTER": "36"}
-                base_map = {"HEX": "23", "DEC": "24", "OCT": "25", "BIN": "26"}
                 if isinstance(last_instruction, str):
-                    if last_instruction in op_map:
-                        display_code = op_map[last_instruction]
-                    elif last_instruction in base_map:
-                        display_code = base_map[last_instruction]
+                    if last_instruction in OPERATOR_KEYCODES:
+                        display_code = OPERATOR_KEYCODES[last_instruction]
+                    elif last_instruction in BASE_KEYCODES:
+                        display_code = BASE_KEYCODES[last_instruction]
                     elif last_instruction.startswith("LBL "):
                         display_code = last_instruction.split()[1]
-                    elif last_instruction in "0123456789ABCDEFabcdef":
+                    elif last_instruction in PROGRAM_DIGITS:
                         display_code = last_instruction.upper()
                     else:
                         display_code = str(last_instruction)
@@ -238,7 +234,7 @@ def action_toggle_program_run(display_widget: Any, controller_obj: Any) -> None:
     else:
         program_logger.info("PROGRAM MODE END")
         display_widget.set_entry(stack.peek(), program_mode=False)
-    logger.info(f"Program mode: {controller_obj.program_mode}")
+    logger.info("Program mode: %s", controller_obj.program_mode)
 
 def action_back_step(display_widget: Any, controller_obj: Any) -> None:
     """
@@ -250,21 +246,22 @@ def action_back_step(display_widget: Any, controller_obj: Any) -> None:
 
     if controller_obj.program_memory:
         removed_instruction = controller_obj.program_memory.pop()
+        controller_obj._program_dirty = True
+        if isinstance(removed_instruction, str) and removed_instruction.startswith("LBL "):
+            controller_obj.forget_label(removed_instruction[4:])
         step = len(controller_obj.program_memory)
-        program_logger.info(f"BST: Removed step {step + 1:03d} - {removed_instruction}")
-        logger.info(f"BST executed: Removed '{removed_instruction}', new length={len(controller_obj.program_memory)}")
+        program_logger.info("BST: Removed step %03d - %s", step + 1, removed_instruction)
+        logger.info("BST executed: Removed '%s', new length=%s", removed_instruction, len(controller_obj.program_memory))
         if controller_obj.program_memory:
             last_instruction = controller_obj.program_memory[-1]
-            op_map = {"÷": "10", "×": "20", "-": "30", "+": "40", ".": "48", "ENTER": "36"}
-            base_map = {"HEX": "23", "DEC": "24", "OCT": "25", "BIN": "26"}
             if isinstance(last_instruction, str):
-                if last_instruction in op_map:
-                    display_code = op_map[last_instruction]
-                elif last_instruction in base_map:
-                    display_code = base_map[last_instruction]
+                if last_instruction in OPERATOR_KEYCODES:
+                    display_code = OPERATOR_KEYCODES[last_instruction]
+                elif last_instruction in BASE_KEYCODES:
+                    display_code = BASE_KEYCODES[last_instruction]
                 elif last_instruction.startswith("LBL "):
                     display_code = last_instruction.split()[1]
-                elif last_instruction in "0123456789ABCDEFabcdef":
+                elif last_instruction in PROGRAM_DIGITS:
                     display_code = last_instruction.upper()
                 else:
                     display_code = str(last_instruction)
@@ -278,7 +275,7 @@ def action_back_step(display_widget: Any, controller_obj: Any) -> None:
         display_widget.set_entry((0, ""), program_mode=True)
 
 def action_roll_up(display_widget: Any, controller_obj: Any) -> None:
-    logger.info(f"R↑ entry: is_user_entry={controller_obj.is_user_entry}, raw_value={controller_obj.display.raw_value}")
+    logger.info("R↑ entry: is_user_entry=%s, raw_value=%s", controller_obj.is_user_entry, controller_obj.display.raw_value)
     if controller_obj.is_user_entry and controller_obj.display.raw_value:
         entry = controller_obj.display.raw_value
         val = controller_obj.stack.interpret_in_base(entry, controller_obj.display.mode)
@@ -286,9 +283,8 @@ def action_roll_up(display_widget: Any, controller_obj: Any) -> None:
         controller_obj.is_user_entry = False
     controller_obj.stack.roll_up()
     top_val = controller_obj.stack.peek()
-    logger.info(f"R↑ result: X={top_val}, stack={controller_obj.stack._stack}")
-    display_widget.set_entry(controller_obj.stack.format_in_base(top_val, display_widget.mode, pad=False))
-    controller_obj.update_stack_display()
+    logger.info("R↑ result: X=%s, stack=%s", top_val, controller_obj.stack._stack)
+    controller_obj._refresh_display()
     controller_obj.stack_lift_enabled = True
     controller_obj.result_displayed = True
     logger.info("Performed R↑: stack rotated up")
@@ -336,11 +332,9 @@ def action_last_x(display_widget: Any, controller_obj: Any) -> None:
     """Recall the last X value (LST X) into the X register."""
     last_x_value = controller_obj.stack.last_x()
     controller_obj.stack.push(last_x_value)
-    formatted_value = controller_obj.stack.format_in_base(last_x_value, display_widget.mode, pad=False)
-    display_widget.set_entry(formatted_value)
-    controller_obj.update_stack_display()
+    formatted_value = controller_obj._refresh_display()
     controller_obj.stack_lift_enabled = False  # Mimics HP-16C: no stack lift after recall
-    logger.info(f"Recalled last X value into X register: {formatted_value}")
+    logger.info("Recalled last X value into X register: %s", formatted_value)
 
 def action_x_not_equal_y(display_widget: Any, controller_obj: Any) -> None:
     """X not equal Y (X≠Y). Placeholder implementation."""
@@ -419,7 +413,7 @@ def g_action(button: Dict[str, Any], display_widget: Any, controller_obj: Any) -
         False (indicating that further processing is not needed).
     """
     sub_text: str = button.get("orig_sub_text", "").strip().upper()
-    logger.info(f"g-mode action: {sub_text}")
+    logger.info("g-mode action: %s", sub_text)
     if sub_text in G_FUNCTIONS:
         G_FUNCTIONS[sub_text](display_widget, controller_obj)
         controller_obj.toggle_mode("g")  # Reset mode to normal after action.
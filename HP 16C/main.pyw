@@ -36,7 +36,7 @@ def load_config() -> Dict[str, Any]:
     config["display_y"] = 20
     config["display_width"] = 575
     config["display_height"] = 80
-    logger.info(f"Config loaded and updated: {config}")
+    logger.info("Config loaded and updated: %s", config)
     return config
 
 def show_user_guide_placeholder() -> None:
@@ -68,13 +68,13 @@ def main() -> None:
         FR_PRIVATE = 0x10  # Font is private to the process, not installed system-wide
         if ctypes.windll.gdi32.AddFontResourceExW(font_path, FR_PRIVATE, 0) > 0:
             custom_font = tkFont.Font(family="Calculator", size=28)
-            logger.info(f"Using font: family=Calculator, size=28 from {font_path}")
+            logger.info("Using font: family=Calculator, size=28 from %s", font_path)
         else:
             raise OSError("Failed to add font resource")
     except (OSError, tk.TclError) as e:
         # Fallback to Courier New if loading fails
         custom_font = tkFont.Font(family="Courier New", size=28)
-        logger.warning(f"Failed to load Calculator font from {font_path}: {e}, using Courier New")
+        logger.warning("Failed to load Calculator font from %s: %s, using Courier New", font_path, e)
 
     config = load_config()
     stack_instance = Stack()
@@ -118,7 +118,7 @@ def main() -> None:
     update_stack()
 
     root.update()
-    logger.info(f"Root window size: {root.winfo_geometry()}")
+    logger.info("Root window size: %s", root.winfo_geometry())
     root.mainloop()
     logger.info("Exiting function: main")
 
@@ -59,7 +59,7 @@ def execute(stack):
     elif instr in {"HEX", "DEC", "OCT", "BIN"}:
         # Execute base change by setting stack mode (no UI update)
         stack.current_mode = "DEC" if instr == "DEC" else instr  # Default to DEC for consistency
-        logger.info(f"Program mode: Set stack base to {stack.current_mode}")
+        logger.info("Program mode: Set stack base to %s", stack.current_mode)
     elif instr.startswith("LBL "):
         pass  # Skip label during execution
     elif instr.startswith("GSB "):
@@ -5,10 +5,12 @@ Author: GlobeyCode
 License: MIT
 Created: 3/23/2025
 Last Modified: 4/01/2025
-Dependencies: Python 3.6+, typing, error, logging_config
+Dependencies: Python 3.6+, logging, collections, typing, error, logging_config, bitops
 """
 
-from typing import Union, Tuple
+import logging
+from collections import deque
+from typing import Deque, Union, Tuple
 from typing import List, Union
 from error import (
     HP16CError, IncorrectWordSizeError, NoValueToShiftError,
@@ -16,12 +18,36 @@ from error import (
     NegativeShiftCountError, InvalidBitOperationError
 )
 from logging_config import logger
+import bitops
 
 Number = Union[int, float]
 
+_RADIX = {"HEX": 16, "BIN": 2, "OCT": 8}
+_COMPLEMENT_MODES = frozenset(("UNSIGNED", "1S", "2S"))
+
+# Seven-segment HEX digits: b and d stay lowercase so they differ from 8 and 0
+_HEX_DISPLAY = str.maketrans("acef", "ACEF")
+
+def format_float(value: Number, commas: bool = False) -> str:
+    """FLOAT-mode text: up to 9 decimals with trailing zeros (and a bare '.') dropped."""
+    value = float(value)
+    if value and value.is_integer():
+        # Whole numbers give the same text straight from int(), without the 9-decimal expansion and two rstrips
+        return f"{int(value):,}" if commas else str(int(value))
+    text = f"{value:,.9f}" if commas else f"{value:.9f}"
+    return text.rstrip('0').rstrip('.')
+
+def _base_specs(word_size: int) -> dict:
+    """format() specs per integer base as (zero-padded to the word size, unpadded)."""
+    return {
+        "BIN": (f"0{word_size}b", "b"),
+        "OCT": (f"0{(word_size + 2) // 3}o", "o"),
+        "HEX": (f"0{(word_size + 3) // 4}x", "x"),
+    }
+
 # Helper functions for signed number conversion
 def to_signed(value: int, word_size: int, mode: str) -> int:
-    mask = (1 << word_size) - 1
+    mask = bitops.WORD_MASKS[word_size]
     value &= mask
     if mode == "UNSIGNED":
         return value
@@ -39,7 +65,7 @@ def to_signed(value: int, word_size: int, mode: str) -> int:
             return value
 
 def from_signed(value: int, word_size: int, mode: str) -> int:
-    mask = (1 << word_size) - 1
+    mask = bitops.WORD_MASKS[word_size]
     if mode == "UNSIGNED":
         return value & mask
     elif mode == "1S":
@@ -50,9 +76,12 @@ def from_signed(value: int, word_size: int, mode: str) -> int:
 class Stack:
     def __init__(self, word_size: int = 16, complement_mode: str = "UNSIGNED") -> None:
         self.word_size: int = word_size
+        self._mask: int = bitops.WORD_MASKS[word_size]  # Updated by set_word_size
+        self._specs: dict = _base_specs(word_size)  # Updated by set_word_size
         self.complement_mode: str = complement_mode
+        self._neg_add: int = 1 if complement_mode == "2S" else 0  # CHS adds this after ~x; set_complement_mode keeps it in step
         self.current_mode: str = "DEC"  # "DEC" or "FLOAT"
-        self._stack: List[int] = [0, 0, 0]  # Y, Z, T
+        self._stack: Deque[int] = deque((0, 0, 0), maxlen=3)  # Y, Z, T; appendleft drops T
         self._x_register: int = 0  # X register
         self._flags: dict[int, int] = {i: 0 for i in range(6)}
         self._last_x: int = 0
@@ -70,7 +99,12 @@ class Stack:
         return self._x_register
 
     def get_state(self) -> List[int]:
-        return [self._x_register] + self._stack
+        return [self._x_register, *self._stack]
+
+    def yzt(self) -> Tuple[int, int, int]:
+        """Return (Y, Z, T) without copying the stack list."""
+        stk = self._stack
+        return stk[0], stk[1], stk[2]
 
     def get_complement_mode(self):
         """Get the current complement mode."""
@@ -106,7 +140,7 @@ class Stack:
             # DEC mode: Handle signed/unsigned integers based on complement mode
             elif base == "DEC":
                 val = int(string_value)  # Convert string to integer in base 10
-                mask = (1 << self.word_size) - 1  # Create mask, e.g., 65535 for 16 bits
+                mask = self._mask  # Create mask, e.g., 65535 for 16 bits
 
                 if self.complement_mode == "UNSIGNED":
                     if val < 0:
@@ -126,30 +160,30 @@ class Stack:
 
             # HEX, BIN, OCT modes: Treat as unsigned integers and apply mask
             else:
-                base_num = {"HEX": 16, "BIN": 2, "OCT": 8}[base]
+                base_num = _RADIX[base]
                 val = int(string_value, base_num)  # Convert string to integer in specified base
-                mask = (1 << self.word_size) - 1
+                mask = self._mask
                 val = val & mask  # Apply word size mask
                 return val
 
         except ValueError as e:
             # Log the error and return a default value
-            logger.info(f"Failed to interpret '{string_value}' in {base}: {e}, defaulting to 0")
+            logger.info("Failed to interpret '%s' in %s: %s, defaulting to 0", string_value, base, e)
             return 0.0 if base == "FLOAT" else 0
 
     def format_in_base(self, value: Number, base: str, pad: bool = False) -> str:
         if base == "FLOAT":
-            result = f"{float(value):.9f}".rstrip('0').rstrip('.')
-            return result if result else '0'
+            return format_float(value)
         value = int(value)
-        mask = (1 << self.word_size) - 1
+        mask = self._mask
         value &= mask  # Ensure value fits within word size
-        display_leading_zeros = (self.test_flag(3) == 1) or pad
-        if base == "BIN":
-            result = format(value, f'0{self.word_size}b') if display_leading_zeros else (format(value, 'b') if value != 0 else '0')
-        elif base == "OCT":
-            oct_digits = (self.word_size + 2) // 3
-            result = format(value, f'0{oct_digits}o') if display_leading_zeros else (format(value, 'o') if value != 0 else '0')
+        display_leading_zeros = self._flags[3] == 1 or pad
+        specs = self._specs.get(base)
+        if specs is not None:
+            # BIN/OCT/HEX: format() does the digit conversion in C; only the spec depends on the word size
+            result = format(value, specs[0] if display_leading_zeros else specs[1])
+            if base == "HEX":
+                result = result.translate(_HEX_DISPLAY)
         elif base == "DEC":
             if self.complement_mode in {"1S", "2S"} and (value & (1 << (self.word_size - 1))):  # Check MSB for sign
                 if self.complement_mode == "1S":
@@ -161,11 +195,6 @@ class Stack:
                     result = str(value - (1 << self.word_size))  # 2's complement: subtract 2^word_size
             else:
                 result = str(value)  # Unsigned or positive value
-        elif base == "HEX":
-            hex_digits = (self.word_size + 3) // 4
-            hex_str = format(value, f'0{hex_digits}x') if display_leading_zeros else (format(value, 'x') if value != 0 else '0')
-            mapping = {'a': 'A', 'c': 'C', 'e': 'E', 'f': 'F'}
-            result = ''.join(mapping.get(c, c) for c in hex_str)
         else:
             result = str(value)
         return result
@@ -173,15 +202,14 @@ class Stack:
 ### PUSH POP PEEK ###
 
     def push(self, value: int) -> None:
-        self._stack.pop()
-        self._stack.insert(0, self._x_register)
+        self._stack.appendleft(self._x_register)  # Old T falls off the end
         self._x_register = value
 
     def pop(self) -> int:
         if self._x_register == 0 and all(x == 0 for x in self._stack):
             raise StackUnderflowError("Stack is empty")
         self._last_x = self._x_register
-        self._x_register = self._stack.pop(0)
+        self._x_register = self._stack.popleft()
         self._stack.append(0)
         return self._last_x
 
@@ -212,12 +240,12 @@ class Stack:
             if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
                 self.set_flag(5)
                 overflow = 1
-            logger.info(f"Add (FLOAT): {y} + {x} = {result}")
+            logger.info("Add (FLOAT): %s + %s = %s", y, x, result)
         else:
             # Integer addition (signed or unsigned)
-            mode = self.get_complement_mode()
-            word_size = self.get_word_size()
-            mask = (1 << word_size) - 1
+            mode = self.complement_mode
+            word_size = self.word_size
+            mask = self._mask
             max_signed = (1 << (word_size - 1)) - 1
             min_signed = -(1 << (word_size - 1))
         
@@ -246,7 +274,7 @@ class Stack:
                 self.set_flag(5)  # Overflow flag
             else:
                 self.clear_flag(5)
-            logger.info(f"Add: {y} + {x} = {result} ({mode}), carry={carry}, overflow={overflow}")
+            logger.info("Add: %s + %s = %s (%s), carry=%s, overflow=%s", y, x, result, mode, carry, overflow)
     
         return result, carry, overflow
 
@@ -272,12 +300,12 @@ class Stack:
             if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
                 self.set_flag(5)
                 overflow = 1
-            logger.info(f"Subtract (FLOAT): {y} - {x} = {result}")
+            logger.info("Subtract (FLOAT): %s - %s = %s", y, x, result)
         else:
             # Integer subtraction (signed or unsigned)
-            mode = self.get_complement_mode()
-            word_size = self.get_word_size()
-            mask = (1 << word_size) - 1
+            mode = self.complement_mode
+            word_size = self.word_size
+            mask = self._mask
             max_signed = (1 << (word_size - 1)) - 1
             min_signed = -(1 << (word_size - 1))
         
@@ -306,7 +334,7 @@ class Stack:
                 self.set_flag(5)  # Overflow flag
             else:
                 self.clear_flag(5)
-            logger.info(f"Subtract: {y} - {x} = {result} ({mode}), borrow={borrow}, overflow={overflow}")
+            logger.info("Subtract: %s - %s = %s (%s), borrow=%s, overflow=%s", y, x, result, mode, borrow, overflow)
     
         return result, borrow, overflow
 
@@ -329,11 +357,11 @@ class Stack:
             if isinstance(result, float) and (result == float('inf') or result == float('-inf')):
                 self.set_flag(5)
                 overflow = 1
-            logger.info(f"Multiply (FLOAT): {y} * {x} = {result}")
+            logger.info("Multiply (FLOAT): %s * %s = %s", y, x, result)
         else:
-            mode = self.get_complement_mode()
-            word_size = self.get_word_size()
-            mask = (1 << word_size) - 1  # 255 for 8-bit
+            mode = self.complement_mode
+            word_size = self.word_size
+            mask = self._mask  # 255 for 8-bit
             if mode == "UNSIGNED":
                 full_result = y * x
                 result = full_result % (mask + 1)  # 2091 % 256 = 43
@@ -350,7 +378,7 @@ class Stack:
             self.clear_flag(5)
             if overflow:
                 self.set_flag(5)
-            logger.info(f"Multiply: {y} * {x} = {result} ({mode}), carry={carry}, overflow={overflow}")
+            logger.info("Multiply: %s * %s = %s (%s), carry=%s, overflow=%s", y, x, result, mode, carry, overflow)
         return result, carry, overflow
 
     def divide(self, y: Number, x: Number) -> Tuple[int, int, int]:
@@ -366,9 +394,9 @@ class Stack:
                     self.set_flag(5)
                     overflow = 1
             else:
-                mode = self.get_complement_mode()
-                word_size = self.get_word_size()
-                mask = (1 << word_size) - 1
+                mode = self.complement_mode
+                word_size = self.word_size
+                mask = self._mask
                 if mode == "UNSIGNED":
                     result = int(y / x)
                     remainder = y % x
@@ -390,199 +418,142 @@ class Stack:
                     self.set_flag(5)
             return result, remainder, overflow
 
+# AND / OR / XOR
+    def logical_and(self, y: Number, x: Number) -> Tuple[int, int, int]:
+        """Bitwise Y AND X; returns (result, 0, 0) like the arithmetic ops and leaves the flags alone."""
+        if self.current_mode == "FLOAT":
+            raise InvalidOperandError()
+        return (int(y) & int(x)) & self._mask, 0, 0
+
+    def logical_or(self, y: Number, x: Number) -> Tuple[int, int, int]:
+        """Bitwise Y OR X; returns (result, 0, 0) like the arithmetic ops and leaves the flags alone."""
+        if self.current_mode == "FLOAT":
+            raise InvalidOperandError()
+        return (int(y) | int(x)) & self._mask, 0, 0
+
+    def logical_xor(self, y: Number, x: Number) -> Tuple[int, int, int]:
+        """Bitwise Y XOR X; returns (result, 0, 0) like the arithmetic ops and leaves the flags alone."""
+        if self.current_mode == "FLOAT":
+            raise InvalidOperandError()
+        return (int(y) ^ int(x)) & self._mask, 0, 0
+
 
 ### f MODE ROW 1 ###
 
 # SL
     def shift_left(self) -> None:
         """Shift the X register left by one bit, respecting word size and complement mode."""
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
-        mode = self.get_complement_mode()
-    
-        # Perform the shift
-        shifted = (self._x_register << 1) & mask
-    
-        # Handle carry flag (bit shifted out)
-        carry = 1 if (self._x_register & (1 << (word_size - 1))) else 0
-        if carry:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
-    
-        # Update X register
+        word_size = self.word_size
+        shifted, carry = bitops.shift_left(self._x_register, word_size)
+        self._flags[4] = carry  # Carry flag is the bit shifted out
         self._x_register = shifted
-    
-        logger.info(f"Shifted left: {shifted} (word size={word_size}, mode={mode}, carry={carry})")
+        logger.info("Shifted left: %s (word size=%s, mode=%s, carry=%s)", shifted, word_size, self.complement_mode, carry)
 # SR
     def shift_right(self) -> None:
         """Shift the X register right by one bit, respecting word size and complement mode."""
-        word_size = self.get_word_size()
-        mode = self.get_complement_mode()
-    
-        # Handle carry flag (least significant bit before shift)
-        carry = self._x_register & 1
-        if carry:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
-    
-        # Perform the shift based on complement mode
+        word_size = self.word_size
+        mode = self.complement_mode
         if mode == "UNSIGNED":
-            shifted = self._x_register >> 1
+            shifted, carry = bitops.shift_right(self._x_register)
         else:  # 1S or 2S (arithmetic shift right, preserve sign bit)
-            # Convert to signed, shift, then back to unsigned representation
-            signed_value = to_signed(self._x_register, word_size, mode)
-            shifted_signed = signed_value >> 1
-            shifted = from_signed(shifted_signed, word_size, mode)
-    
-        # Update X register
+            carry = self._x_register & 1
+            shifted = from_signed(to_signed(self._x_register, word_size, mode) >> 1, word_size, mode)
+        self._flags[4] = carry  # Carry flag is the least significant bit before the shift
         self._x_register = shifted
-    
-        logger.info(f"Shifted right: {shifted} (word size={word_size}, mode={mode}, carry={carry})")
+        logger.info("Shifted right: %s (word size=%s, mode=%s, carry=%s)", shifted, word_size, mode, carry)
 # RL
     def rotate_left(self) -> None:
         """Rotate the X register left by one bit, wrapping MSB to LSB."""
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
-        mode = self.get_complement_mode()
-    
-        # Perform the rotation
-        msb = self._x_register & (1 << (word_size - 1))  # Get MSB
-        shifted = (self._x_register << 1) & mask  # Shift left within word size
-        rotated = shifted | (1 if msb else 0)  # Wrap MSB to LSB
-    
-        # Handle carry flag (MSB before rotation)
-        carry = 1 if msb else 0
-        if carry:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
-    
-        # Update X register
+        word_size = self.word_size
+        rotated, carry = bitops.rotate_left(self._x_register, word_size)
+        self._flags[4] = carry  # Carry flag is the MSB before rotation
         self._x_register = rotated
-    
-        logger.info(f"Rotated left: {rotated} (word size={word_size}, mode={mode}, carry={carry})")
+        logger.info("Rotated left: %s (word size=%s, mode=%s, carry=%s)", rotated, word_size, self.complement_mode, carry)
 # RR
     def rotate_right(self) -> None:
         """Rotate the X register right by one bit, wrapping LSB to MSB."""
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
-        mode = self.get_complement_mode()
-
-        # Perform the rotation
-        lsb = self._x_register & 1  # Get LSB
-        shifted = self._x_register >> 1  # Shift right
-        rotated = shifted | (lsb << (word_size - 1))  # Wrap LSB to MSB
-
-        # Handle carry flag (LSB before rotation)
-        carry = 1 if lsb else 0
-        if carry:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
-
-        # Update X register
+        word_size = self.word_size
+        rotated, carry = bitops.rotate_right(self._x_register, word_size)
+        self._flags[4] = carry  # Carry flag is the LSB before rotation
         self._x_register = rotated
-
-        logger.info(f"Rotated right: {rotated} (word size={word_size}, mode={mode}, carry={carry})")
+        logger.info("Rotated right: %s (word size=%s, mode=%s, carry=%s)", rotated, word_size, self.complement_mode, carry)
 # RLn
     def rotate_left_carry(self) -> None:
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if word_size <= 0:
             raise ValueError("Word size must be positive")
         if self._x_register < 0 or self._x_register >= word_size:
             raise NegativeShiftCountError("Invalid rotation count", "E108")
-        mask = (1 << word_size) - 1
-        n = self._x_register & mask  # n = 1
-        carry_in = 1 if self.test_flag(4) else 0
-        rotated = ((self._x_register << n) | (self._x_register >> (word_size - n))) & mask
-        carry_out = 1 if (rotated & (1 << (word_size - 1))) else 0
-        if carry_out:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
+        n = self._x_register
+        carry_in = self._flags[4]
+        rotated, carry_out = bitops.rotate_left_n(self._x_register, word_size, n)
+        self._flags[4] = carry_out
         self._x_register = rotated
-        logger.info(f"Rotated left with carry by {n}: {rotated} (word_size={word_size}, carry_in={carry_in}, carry_out={carry_out})")
+        logger.info("Rotated left with carry by %s: %s (word_size=%s, carry_in=%s, carry_out=%s)", n, rotated, word_size, carry_in, carry_out)
 # RRn
     def rotate_right_carry(self) -> None:
         """Rotate X right by X bits through carry, matching real HP-16C RRn behavior."""
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
-        n = self._x_register & mask  # Rotate by X’s value (14)
-        carry_in = 1 if self.test_flag(4) else 0
-        # Rotate n bits: (x >> n) | (x << (word_size - n))
-        rotated = ((self._x_register >> n) | (self._x_register << (word_size - n))) & mask
-        # Carry: LSB after rotation
-        carry_out = 1 if (rotated & 1) else 0
-        if carry_out:
-            self.set_flag(4)
-        else:
-            self.clear_flag(4)
+        word_size = self.word_size
+        n = self._x_register & self._mask  # Rotate by X’s value
+        carry_in = self._flags[4]
+        rotated, carry_out = bitops.rotate_right_n(self._x_register, word_size, n)
+        self._flags[4] = carry_out
         self._x_register = rotated
-        logger.info(f"Rotated right with carry by {n}: {rotated} (word_size={word_size}, carry_in={carry_in}, carry_out={carry_out})")
+        logger.info("Rotated right with carry by %s: %s (word_size=%s, carry_in=%s, carry_out=%s)", n, rotated, word_size, carry_in, carry_out)
 # MASKL
     def mask_left(self, bits: int) -> None:
         """Mask the Y register with 'bits' 1s from the left, drop into X, preserve stack."""
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if not 0 <= bits <= word_size:
             raise InvalidBitOperationError(f"Bit count {bits} out of range (0-{word_size})")
         if len(self._stack) < 1:
             raise StackUnderflowError("Need Y value for MASKL")
     
-        mask = ((1 << bits) - 1) << (word_size - bits)
+        mask = bitops.left_mask(bits, word_size)
         y = self._stack[0]  # Get Y
         result = y & mask   # Compute masked value
     
         # Store old X in _last_x to track it
         self._last_x = self._x_register
         self._x_register = result
-        # Shift stack: Y stays, Z and T shift up
-        self._stack.pop(0)  # Remove old Y
-        self._stack.insert(0, y)  # Preserve Y
-        while len(self._stack) < 3:
-            self._stack.append(0)
-        if len(self._stack) > 3:
-            self._stack.pop(-1)
+        # Y, Z and T are left as they were
     
         self.clear_flag(4)
         self.clear_flag(5)
-        logger.info(f"Masked left {bits} bits: Y={y} -> X={self._x_register}, last_x={self._last_x}, stack={self._stack}")
+        logger.info("Masked left %s bits: Y=%s -> X=%s, last_x=%s, stack=%s", bits, y, self._x_register, self._last_x, self._stack)
 # MASKR
     def mask_right(self, bits: int) -> None:
         """Mask the Y register with 'bits' 1s from the right, drop into X, preserve stack."""
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if not 0 <= bits <= word_size:
             raise InvalidBitOperationError(f"Bit count {bits} out of range (0-{word_size})")
         if len(self._stack) < 1:
             raise StackUnderflowError("Need Y value for MASKR")
     
-        mask = (1 << bits) - 1
+        mask = bitops.right_mask(bits)
         y = self._stack[0]
         result = y & mask
     
-        self._stack.pop(0)
-        self._stack.insert(0, y)  # Preserve original Y
-        self._x_register = result
-    
-        while len(self._stack) < 3:
-            self._stack.append(0)
-        if len(self._stack) > 3:
-            self._stack.pop(-1)
+        self._x_register = result  # Y, Z and T are left as they were
     
         self.clear_flag(4)
         self.clear_flag(5)
-        logger.info(f"Masked right {bits} bits: Y={y} -> X={self._x_register} (mask={mask:0{word_size}b}), stack={self._stack}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Masked right %s bits: Y=%s -> X=%s (mask=%s), stack=%s", bits, y, self._x_register, format(mask, f"0{word_size}b"), self._stack)
 # RMD
     def remainder(self) -> None:
         old_x = self._x_register
         self._x_register = self._last_remainder  # Use _last_remainder
-        self._stack.insert(0, old_x)
-        while len(self._stack) > 3:
-            self._stack.pop(-1)
+        self._stack.appendleft(old_x)
         self.clear_flag(4)
         self.clear_flag(5)
-        logger.info(f"Retrieved remainder: X={self._last_remainder} from last_remainder, old_X={old_x}, stack={self._stack}")
+        logger.info("Retrieved remainder: X=%s from last_remainder, old_X=%s, stack=%s", self._last_remainder, old_x, self._stack)
+
+# NOT
+    def logical_not(self) -> None:
+        """One's complement of X within the word size; flags are unaffected."""
+        self._last_x = self._x_register
+        self._x_register = ~self._x_register & self._mask  # Cached word mask, kept current by set_word_size
 
 ### f MODE ROW 2 ###
 
@@ -596,17 +567,15 @@ class Stack:
         Raises:
             InvalidBitOperationError: If bit_index is out of range.
         """
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if not 0 <= bit_index < word_size:
             raise InvalidBitOperationError(f"Bit {bit_index} beyond 0-{word_size-1}")
         
-        mask = 1 << bit_index
         self._last_x = self._x_register  # Save X before modification
-        self._x_register |= mask         # Set the bit
-        self._x_register &= (1 << word_size) - 1  # Ensure it fits word size
+        self._x_register = (self._x_register | bitops.BIT_MASKS[bit_index]) & self._mask
         self.clear_flag(4)               # Clear carry flag
         self.clear_flag(5)               # Clear overflow flag
-        logger.info(f"Set bit {bit_index} in X: {self._x_register}")
+        logger.info("Set bit %s in X: %s", bit_index, self._x_register)
 # CB
     def clear_bit(self, bit_index: int) -> None:
         """Clear the specified bit in the X register to 0 (CB operation).
@@ -617,17 +586,15 @@ class Stack:
         Raises:
             InvalidBitOperationError: If bit_index is out of range.
         """
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if not 0 <= bit_index < word_size:
             raise InvalidBitOperationError(f"Bit index {bit_index} out of range (0-{word_size-1})")
         
-        mask = ~(1 << bit_index)
         self._last_x = self._x_register  # Save X before modification
-        self._x_register &= mask         # Clear the bit
-        self._x_register &= (1 << word_size) - 1  # Ensure it fits word size
+        self._x_register &= self._mask ^ bitops.BIT_MASKS[bit_index]  # Word mask with the bit knocked out
         self.clear_flag(4)               # Clear carry flag
         self.clear_flag(5)               # Clear overflow flag
-        logger.info(f"Cleared bit {bit_index} in X: {self._x_register}")
+        logger.info("Cleared bit %s in X: %s", bit_index, self._x_register)
 # B?
     def test_bit(self, bit_index: int) -> int:
         """Test if the specified bit in the X register is set (B? operation).
@@ -641,15 +608,14 @@ class Stack:
         Raises:
             InvalidBitOperationError: If bit_index is out of range.
         """
-        word_size = self.get_word_size()
+        word_size = self.word_size
         if not 0 <= bit_index < word_size:
             raise InvalidBitOperationError(f"Bit index {bit_index} out of range (0-{word_size-1})")
         
-        mask = 1 << bit_index
-        result = 1 if (self._x_register & mask) else 0
+        result = 1 if (self._x_register & bitops.BIT_MASKS[bit_index]) else 0
         self.clear_flag(4)  # Clear carry flag
         self.clear_flag(5)  # Clear overflow flag
-        logger.info(f"Tested bit {bit_index} in X={self._x_register}: {'set' if result else 'clear'}")
+        logger.info("Tested bit %s in X=%s: %s", bit_index, self._x_register, 'set' if result else 'clear')
         return result
 # BIT Related
     def count_bits(self) -> int:
@@ -658,13 +624,13 @@ class Stack:
         Returns:
             int: The number of 1 bits in X, respecting word size.
         """
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
+        word_size = self.word_size
+        mask = self._mask
         x = self._x_register & mask  # Ensure X fits within word size
-        count = bin(x).count('1')    # Count 1s in binary representation
+        count = bitops.popcount(x)   # Count 1s in binary representation
         self.clear_flag(4)           # Clear carry flag (no carry in this operation)
         self.clear_flag(5)           # Clear overflow flag
-        logger.info(f"Counted bits in X={x}: {count} ones")
+        logger.info("Counted bits in X=%s: %s ones", x, count)
         self._last_x = self._x_register  # Save X for potential recall
         self._x_register = count     # Replace X with the count
         return count
@@ -683,14 +649,14 @@ class Stack:
         Raises:
             ValueError: If mode is not "UNSIGNED", "1S", or "2S".
         """
-        valid_modes = {"UNSIGNED", "1S", "2S"}
-        if mode not in valid_modes:
+        if mode not in _COMPLEMENT_MODES:
             raise ValueError(f"Invalid complement mode: {mode}")
         old_mode = self.complement_mode
         if old_mode == mode:
             return
         self.complement_mode = mode
-        logger.info(f"Complement mode changed from {old_mode} to {mode}")
+        self._neg_add = 1 if mode == "2S" else 0
+        logger.info("Complement mode changed from %s to %s", old_mode, mode)
 
 ### f MODE ROW 4 ###
 
@@ -700,18 +666,18 @@ class Stack:
             raise IncorrectWordSizeError(f"Invalid WSIZE:{bits} <= 64")
         old_word_size = self.word_size
         self.word_size = bits
-        mask = (1 << bits) - 1
+        mask = self._mask = bitops.WORD_MASKS[bits]
+        self._specs = _base_specs(bits)
         self._x_register = self._x_register & mask
         for i in range(len(self._stack)):
             self._stack[i] = self._stack[i] & mask
         for i in range(len(self._data_registers)):
             self._data_registers[i] = self._data_registers[i] & mask
         self._i_register = self._i_register & mask
-        logger.info(f"Word size changed from {old_word_size} to {bits} bits")
+        logger.info("Word size changed from %s to %s bits", old_word_size, bits)
 # WSIZE Related
     def apply_word_size(self, value: int) -> int:
-        mask = (1 << self.word_size) - 1
-        return value & mask
+        return value & self._mask
     def get_word_size(self):
         """Get the current word size."""
         return self.word_size
@@ -722,8 +688,8 @@ class Stack:
 # LJ
     def left_justify(self) -> None:
         """Shift X left until the most significant bit is 1 or X is 0 (LJ operation)."""
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
+        word_size = self.word_size
+        mask = self._mask
         x = self._x_register & mask
         
         if x == 0:
@@ -743,22 +709,22 @@ class Stack:
         self._x_register = (x << shift_amount) & mask
         self.clear_flag(4)  # Clear carry
         self.clear_flag(5)  # Clear overflow
-        logger.info(f"Left justified X: shifted {shift_amount} bits, result={self._x_register}")
+        logger.info("Left justified X: shifted %s bits, result=%s", shift_amount, self._x_register)
 # ABS 
     def absolute(self) -> None:
         """Set the X register to its absolute value (ABS operation)."""
-        word_size = self.get_word_size()
-        mode = self.get_complement_mode()
-        mask = (1 << word_size) - 1
+        word_size = self.word_size
+        mode = self.complement_mode
+        mask = self._mask
         
         if self.current_mode == "FLOAT":
             self._x_register = abs(float(self._x_register))
-            logger.info(f"Absolute (FLOAT): X set to {self._x_register}")
+            logger.info("Absolute (FLOAT): X set to %s", self._x_register)
         else:
             signed_value = to_signed(self._x_register, word_size, mode)
             abs_value = abs(signed_value)
             self._x_register = from_signed(abs_value, word_size, mode)
-            logger.info(f"Absolute ({mode}): X={signed_value} set to {self._x_register}")
+            logger.info("Absolute (%s): X=%s set to %s", mode, signed_value, self._x_register)
         
         self.clear_flag(4)  # Clear carry flag
         self.clear_flag(5)  # Clear overflow flag
@@ -773,23 +739,20 @@ class Stack:
         if x == 0:
             raise DivisionByZeroError()
         
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
+        word_size = self.word_size
+        mask = self._mask
         # Simplified: treat as single-word division for now
         result = (y // x) & mask
         remainder = (y % x) & mask
         self._last_x = remainder
         self._x_register = result
-        self._stack.pop(0)
-        self._stack.insert(0, 0)  # Clear Y
-        while len(self._stack) < 3:
-            self._stack.append(0)
+        self._stack[0] = 0  # Clear Y
         if remainder != 0:
             self.set_flag(4)
         else:
             self.clear_flag(4)
         self.clear_flag(5)
-        logger.info(f"Double divide: {y} / {x} = {result}, remainder={remainder}")
+        logger.info("Double divide: %s / %s = %s, remainder=%s", y, x, result, remainder)
 
 
 ### g MODE ROW 2 ###
@@ -806,7 +769,7 @@ class Stack:
 # Flag Related
     def set_g_flag(self, value):
         self._flags[5] = value  # Use integer 5
-        logger.info(f"G flag set to {value}")
+        logger.info("G flag set to %s", value)
     def get_g_flag(self):
         return self._flags[5]  
     def get_flags_bitfield(self) -> int:
@@ -821,20 +784,17 @@ class Stack:
             raise StackUnderflowError("Need Y value for double multiply")
         y = self._stack[0]
         x = self._x_register
-        word_size = self.get_word_size()
-        mask = (1 << word_size) - 1
+        word_size = self.word_size
+        mask = self._mask
         
         # Double-word multiplication (simplified to single-word result for now)
         result = (y * x) & mask  # Truncate to word size
         self._last_x = self._x_register
         self._x_register = result
-        self._stack.pop(0)
-        self._stack.insert(0, 0)  # Clear Y
-        while len(self._stack) < 3:
-            self._stack.append(0)
+        self._stack[0] = 0  # Clear Y
         self.clear_flag(4)
         self.clear_flag(5)
-        logger.info(f"Double multiply: {y} * {x} = {result} (low word)")
+        logger.info("Double multiply: %s * %s = %s (low word)", y, x, result)
 
 
 ### g MODE ROW 3 ###
@@ -842,13 +802,11 @@ class Stack:
 # R↑
     def roll_up(self) -> None:
         """Roll up the stack: T→X, X→Y, Y→Z, Z→T."""
-        logger.info(f"Before R↑: X={self._x_register}, stack={self._stack}")
+        logger.info("Before R↑: X=%s, stack=%s", self._x_register, self._stack)
         old_t = self._stack[2]
-        self._stack[2] = self._stack[1]
-        self._stack[1] = self._stack[0]
-        self._stack[0] = self._x_register
+        self._stack.appendleft(self._x_register)  # Drops old T, which becomes X
         self._x_register = old_t
-        logger.info(f"After R↑: X={self._x_register}, stack={self._stack}")
+        logger.info("After R↑: X=%s, stack=%s", self._x_register, self._stack)
 
 ### g MODE ROW 4 ###
 
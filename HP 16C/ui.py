@@ -22,9 +22,9 @@ def setup_ui(root: tk.Tk, stack: Stack, config: Dict[str, Any], Courier: tkFont.
     total_width = 1049 + 2 * config["margin"]
     total_height = 560
     logger.info(
-        f"Setting up UI: display at x={config.get('display_x', config['margin'])}, "
-        f"y={config.get('display_y', config['margin'])}, width={config['display_width']}, "
-        f"height={config['display_height']}, grid=4x10, total={total_width}x{total_height}"
+        "Setting up UI: display at x=%s, y=%s, width=%s, height=%s, grid=4x10, total=%sx%s",
+        config.get('display_x', config['margin']), config.get('display_y', config['margin']),
+        config['display_width'], config['display_height'], total_width, total_height
     )
 
     # Initialize the display
@@ -81,18 +81,18 @@ def setup_ui(root: tk.Tk, stack: Stack, config: Dict[str, Any], Courier: tkFont.
         main_text = (btn_dict.get('orig_main_text') or '').replace('\n', '')
         sub_text = (btn_dict.get('orig_sub_text') or '').replace('\n', '')
         logger.info(
-            f"Button {cfg.row},{cfg.col}: {top_text}/{main_text}/{sub_text}, "
-            f"{cfg.width}x{cfg.height}, rowspan={rowspan}"
+            "Button %s,%s: %s/%s/%s, %sx%s, rowspan=%s",
+            cfg.row, cfg.col, top_text, main_text, sub_text, cfg.width, cfg.height, rowspan
         )
         buttons_list.append(btn_dict)
-    logger.info(f"Total buttons created: {len(buttons_list)}")
+    logger.info("Total buttons created: %s", len(buttons_list))
 
     # Configure grid
     for col in range(max_cols):
         buttons_frame.grid_columnconfigure(col, uniform="col", minsize=75)
     for row in range(max_rows):
         buttons_frame.grid_rowconfigure(row, uniform="row", minsize=base_row_height)
-    logger.info(f"Grid configured: {max_cols} cols, {max_rows} rows, minsize={base_row_height}")
+    logger.info("Grid configured: %s cols, %s rows, minsize=%s", max_cols, max_rows, base_row_height)
 
     # Add branding label
     branding_label = tk.Label(